@@ -5,25 +5,85 @@ Serves both API endpoints and web interface for weapon generation
 """
 
 import os
-import json
+import gc
+import copy
+import contextlib
+import functools
+import itertools
+import hashlib
 import time
-import glob
+import queue
 import zipfile
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_file, send_from_directory
+from typing import List, Optional
+from flask import Flask, Response, request, jsonify, render_template, send_file, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from pydantic import BaseModel, ConfigDict, ValidationError
+import orjson
 from dotenv import load_dotenv
 from loguru import logger
+
+# Optional binary encodings for the weapon listing
+try:
+    import ormsgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Optional shared scenario cache across server processes
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Load environment variables
+load_dotenv()
+
+# Allocator and threading settings must be in place before torch initializes
+os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True,max_split_size_mb:512')
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
 import torch
 
+# Request threads run alongside model calls; keep torch from spawning a full
+# intra-op pool per thread and oversubscribing the CPU
+torch.set_num_threads(int(os.getenv('TORCH_NUM_THREADS', '1')))
+torch.set_num_interop_threads(1)
+
+# Input shapes are stable across requests: let cuDNN autotune once, and allow TF32 matmuls
+torch.backends.cudnn.benchmark = True
+torch.set_float32_matmul_precision('high')
+
 from models.text_generator import WeaponTextGenerator
 from models.model_generator import WeaponModelGenerator
+from weapon_index import WeaponIndex
+from gpu_worker import RemoteGenerator
 
-# Load environment variables
-load_dotenv()
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Configuration
@@ -34,20 +94,156 @@ CONFIG = {
     'TEMPLATES_DIR': './templates',
     'MAX_WEAPONS_PER_REQUEST': 4,
     'MODEL_CACHE_SIZE': 2,
-    'WEB_INTERFACE_ENABLED': True
+    'MODEL_DTYPE': os.getenv('MODEL_DTYPE', 'auto'),  # auto | bf16 | fp16 | fp32 | int8 | int4 | fp8
+    'COMPILE_MODELS': os.getenv('COMPILE_MODELS', 'False').lower() == 'true',
+    # Directory of an `optimum-cli export onnx --task text-generation-with-past` export
+    'TEXT_MODEL_ONNX_PATH': os.getenv('TEXT_MODEL_ONNX_PATH'),
+    'SAMPLE_DESCRIPTIONS': os.getenv('SAMPLE_DESCRIPTIONS', 'True').lower() == 'true',
+    'AI_DESCRIPTION_RATE': float(os.getenv('AEON_AI_DESC_RATE', 0.25)),
+    'WEB_INTERFACE_ENABLED': True,
+    'MAX_BATCH': int(os.getenv('MAX_BATCH', 8)),
+    'MAX_BATCH_DELAY_MS': int(os.getenv('MAX_BATCH_DELAY_MS', 10)),
+    'BATCH_TIMEOUT': int(os.getenv('BATCH_TIMEOUT', 120)),
+    'MODEL_BATCH_TIMEOUT': int(os.getenv('MODEL_BATCH_TIMEOUT', 600)),
+    'STATS_TOP_K': int(os.getenv('STATS_TOP_K', 50)),
+    'EMPTY_CACHE_AFTER_BATCH': os.getenv('EMPTY_CACHE_AFTER_BATCH', 'True').lower() == 'true',
+    'SCENARIO_CACHE_SIZE': int(os.getenv('SCENARIO_CACHE_SIZE', 1024)),
+    'SCENARIO_CACHE_TTL': int(os.getenv('SCENARIO_CACHE_TTL', 3600)),
+    'REDIS_URL': os.getenv('REDIS_URL'),
+    'DOWNLOAD_MAX_AGE': int(os.getenv('DOWNLOAD_MAX_AGE', 31536000)),
+    'ZIP_CACHE_DIR': os.getenv('ZIP_CACHE_DIR', './zip_cache'),
+    # Kept outside WEAPON_OUTPUT_DIR: its journal files would otherwise change the directory mtime
+    'WEAPON_INDEX_PATH': os.getenv('WEAPON_INDEX_PATH', './weapon_index.sqlite'),
+    # Minimum seconds between rescans of the output directory for changes made outside the API
+    'INDEX_RESYNC_INTERVAL': int(os.getenv('INDEX_RESYNC_INTERVAL', 30)),
+    'USE_X_SENDFILE': os.getenv('USE_X_SENDFILE', 'False').lower() == 'true',
+    'WARMUP_ITERATIONS': int(os.getenv('WARMUP_ITERATIONS', 2)),
+    # When set, models live in a separate gpu_worker.py process listening on this Unix socket
+    'GPU_WORKER_ADDRESS': os.getenv('GPU_WORKER_ADDRESS'),
+    'GPU_WORKER_AUTHKEY': os.getenv('GPU_WORKER_AUTHKEY', 'aeon-weapon-ai'),
+    'MAX_GPU_CONCURRENCY': int(os.getenv('MAX_GPU_CONCURRENCY', 1)),
+    'MAX_QUEUE': int(os.getenv('MAX_QUEUE', 32))
 }
 
+# Behind a front server that understands X-Sendfile, let it serve file bodies;
+# otherwise gunicorn's wsgi.file_wrapper streams them with sendfile(2)
+app.use_x_sendfile = CONFIG['USE_X_SENDFILE']
+
+# Request schemas
+class GenerateWeaponsRequest(BaseModel):
+    player1_personality: str
+    player2_personality: str
+    arena_theme: str = 'medieval'
+    # Force AI descriptions on (hero weapons) or off, instead of AI_DESCRIPTION_RATE
+    use_ai: Optional[bool] = None
+
+class StreamWeaponsRequest(GenerateWeaponsRequest):
+    # Also build each weapon's 3D model and send the weapon again once its file is ready
+    create_models: bool = False
+
+class CreateModelRequest(BaseModel):
+    description: str
+    output_path: Optional[str] = None
+
+class BatchWeapon(BaseModel):
+    # Weapons carry the full scenario; only the fields used here are declared
+    model_config = ConfigDict(extra='allow')
+    
+    description: str
+    fileLocation: str
+    weaponName: Optional[str] = None
+    webPath: Optional[str] = None
+
+class BatchCreateRequest(BaseModel):
+    weapons: List[BatchWeapon]
+
+def validation_error_response(error):
+    """Build a 400 response from a pydantic validation error"""
+    details = error.errors()[0]
+    field = '.'.join(str(part) for part in details['loc'])
+    
+    if details['type'] == 'missing':
+        message = f'Missing required field: {field}'
+    elif field:
+        message = f"Invalid field {field}: {details['msg']}"
+    else:
+        message = details['msg']
+    
+    return jsonify({'error': message}), 400
+
+def server_busy_response():
+    """Build the 429 response for a request arriving with all MAX_QUEUE slots taken"""
+    response = jsonify({'error': 'Server busy, retry later'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+def limit_in_flight(view):
+    """Reject generation requests with 429 once MAX_QUEUE of them are already in flight"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not in_flight_slots.acquire(blocking=False):
+            return server_busy_response()
+        
+        try:
+            return view(*args, **kwargs)
+        finally:
+            in_flight_slots.release()
+    
+    return wrapper
+
 # Global model instances
 text_generator = None
 model_generator = None
 generation_stats = {
     'total_generated': 0,
     'successful_generations': 0,
-    'average_time': 0,
+    'time_sum': 0.0,
     'last_generation': None,
-    'personality_counts': {},
-    'arena_theme_counts': {}
+    'personality_counts': Counter(),
+    'arena_theme_counts': Counter()
 }
+stats_lock = threading.Lock()
+
+# Sequence for weapon file names; with the timestamp and pid it keeps names unique
+# across concurrent requests in the same second and across server processes
+weapon_file_counter = itertools.count()
+
+# Dedicated CUDA streams per model, created in initialize_models()
+cuda_streams = {}
+
+# Bounded worker pool so concurrent 3D generations can't exhaust GPU memory while
+# request threads remain free to accept and validate other requests
+GPU_EXECUTOR = ThreadPoolExecutor(max_workers=CONFIG['MAX_GPU_CONCURRENCY'], thread_name_prefix='gpu-worker')
+
+# Generation requests admitted at once; beyond this, clients get 429 instead of queueing
+in_flight_slots = threading.BoundedSemaphore(CONFIG['MAX_QUEUE'])
+
+# SQLite index of generated weapons, resynced only when the output directory
+# changes outside of the API
+weapon_index = None
+weapon_index_lock = threading.Lock()
+_index_state = {'dir_mtime': None, 'synced_at': 0.0}
+
+# LRU cache of generated scenarios keyed by (player1, player2, arena_theme, num_weapons),
+# holding (expires_at, scenarios) entries
+scenario_cache = OrderedDict()
+scenario_cache_lock = threading.Lock()
+
+# With REDIS_URL set, scenarios are cached in Redis so every worker process shares them
+redis_client = None
+if CONFIG['REDIS_URL']:
+    if REDIS_AVAILABLE:
+        redis_client = redis.Redis.from_url(CONFIG['REDIS_URL'])
+    else:
+        logger.warning("REDIS_URL is set but redis is not installed; using the in-process scenario cache")
+
+# Scenario requests waiting for the batch dispatcher: (payload, event, result_box)
+scenario_queue = queue.Queue()
+scenario_dispatcher = None
+
+# Single 3D model requests waiting to be generated together: (payload, event, result_box)
+model_queue = queue.Queue()
+model_dispatcher = None
 
 def initialize_models():
     """Initialize AI models on startup"""
@@ -55,17 +251,69 @@ def initialize_models():
     
     logger.info("Initializing AI models...")
     
+    # Drop previously loaded models before loading replacements so a reload
+    # never holds two copies in GPU memory
+    if text_generator is not None or model_generator is not None:
+        text_generator = None
+        model_generator = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    
     try:
+        if CONFIG['GPU_WORKER_ADDRESS']:
+            # Share one copy of the models across all HTTP workers
+            authkey = CONFIG['GPU_WORKER_AUTHKEY'].encode()
+            text_generator = RemoteGenerator(CONFIG['GPU_WORKER_ADDRESS'], 'text', authkey)
+            model_generator = RemoteGenerator(CONFIG['GPU_WORKER_ADDRESS'], 'model', authkey)
+            text_generator.get_supported_personalities()
+            logger.info(f"✓ Using GPU worker at {CONFIG['GPU_WORKER_ADDRESS']}")
+            
+            os.makedirs(CONFIG['WEAPON_OUTPUT_DIR'], exist_ok=True)
+            os.makedirs(CONFIG['ZIP_CACHE_DIR'], exist_ok=True)
+            get_weapon_index()
+            start_scenario_dispatcher()
+            start_model_dispatcher()
+            
+            logger.success("Connected to GPU worker successfully!")
+            return True
+        
         # Initialize text generator for weapon scenarios
-        text_generator = WeaponTextGenerator()
+        text_generator = WeaponTextGenerator(
+            model_dtype=CONFIG['MODEL_DTYPE'],
+            compile_model=CONFIG['COMPILE_MODELS'],
+            onnx_path=CONFIG['TEXT_MODEL_ONNX_PATH'],
+            sample_descriptions=CONFIG['SAMPLE_DESCRIPTIONS'],
+            ai_description_rate=CONFIG['AI_DESCRIPTION_RATE']
+        )
         logger.info("✓ Text generator loaded")
         
         # Initialize 3D model generator (Hunyuan3D-2)
-        model_generator = WeaponModelGenerator()
+        model_generator = WeaponModelGenerator(compile_model=CONFIG['COMPILE_MODELS'])
         logger.info("✓ 3D model generator loaded")
         
-        # Create output directory
+        # Pay kernel selection and allocator growth before the first request
+        if CONFIG['WARMUP_ITERATIONS'] > 0:
+            text_generator.warmup(CONFIG['WARMUP_ITERATIONS'])
+            model_generator.warmup(CONFIG['WARMUP_ITERATIONS'])
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+        
+        # Create output directories
         os.makedirs(CONFIG['WEAPON_OUTPUT_DIR'], exist_ok=True)
+        os.makedirs(CONFIG['ZIP_CACHE_DIR'], exist_ok=True)
+        
+        # Open the weapon index and reconcile it with the files on disk
+        get_weapon_index()
+        
+        # Give each model its own stream so text and 3D work can overlap
+        if torch.cuda.is_available():
+            cuda_streams['text'] = torch.cuda.Stream()
+            cuda_streams['model'] = torch.cuda.Stream()
+        
+        # Start the scenario and 3D model batch dispatchers
+        start_scenario_dispatcher()
+        start_model_dispatcher()
         
         logger.success("All models initialized successfully!")
         return True
@@ -74,27 +322,269 @@ def initialize_models():
         logger.error(f"Failed to initialize models: {e}")
         return False
 
-def update_stats(weapons, generation_time, success=True):
+def update_stats(weapons, generation_time, success=True, arena_theme=None):
     """Update generation statistics"""
-    global generation_stats
+    personalities = [weapon.get('personality', 'unknown') for weapon in weapons] if weapons else []
+    last_generation = datetime.now().isoformat()
     
-    generation_stats['total_generated'] += len(weapons) if weapons else 0
-    if success:
-        generation_stats['successful_generations'] += 1
+    with stats_lock:
+        generation_stats['total_generated'] += len(personalities)
+        if success:
+            generation_stats['successful_generations'] += 1
+            generation_stats['time_sum'] += generation_time
+        
+        generation_stats['last_generation'] = last_generation
+        generation_stats['personality_counts'].update(personalities)
+        if arena_theme is not None:
+            generation_stats['arena_theme_counts'][arena_theme] += 1
+
+def get_stats_snapshot():
+    """Get a consistent copy of generation statistics for responses"""
+    top_k = CONFIG['STATS_TOP_K']
+    
+    with stats_lock:
+        successful = generation_stats['successful_generations']
+        snapshot = {
+            'total_generated': generation_stats['total_generated'],
+            'successful_generations': successful,
+            'average_time': generation_stats['time_sum'] / successful if successful else 0,
+            'last_generation': generation_stats['last_generation'],
+            'personality_counts': dict(generation_stats['personality_counts'].most_common(top_k)),
+            'arena_theme_counts': dict(generation_stats['arena_theme_counts'].most_common(top_k))
+        }
     
-    # Update average time
-    if generation_stats['successful_generations'] > 0:
-        old_avg = generation_stats['average_time']
-        count = generation_stats['successful_generations']
-        generation_stats['average_time'] = (old_avg * (count - 1) + generation_time) / count
+    return snapshot
+
+# ===============================
+# REQUEST BATCHING
+# ===============================
+
+def start_scenario_dispatcher():
+    """Start the background thread that batches scenario requests"""
+    global scenario_dispatcher
+    
+    if scenario_dispatcher is not None and scenario_dispatcher.is_alive():
+        return
+    
+    scenario_dispatcher = threading.Thread(
+        target=scenario_dispatch_loop,
+        name='scenario-dispatcher',
+        daemon=True
+    )
+    scenario_dispatcher.start()
+    logger.info(f"Scenario dispatcher started (max batch {CONFIG['MAX_BATCH']}, "
+                f"max delay {CONFIG['MAX_BATCH_DELAY_MS']}ms)")
+
+def start_model_dispatcher():
+    """Start the background thread that batches single 3D model requests"""
+    global model_dispatcher
+    
+    if model_dispatcher is not None and model_dispatcher.is_alive():
+        return
+    
+    model_dispatcher = threading.Thread(
+        target=model_dispatch_loop,
+        name='model-dispatcher',
+        daemon=True
+    )
+    model_dispatcher.start()
+    logger.info("3D model dispatcher started")
+
+def collect_batch(request_queue):
+    """Block for the first queued request, then gather more until the batch window closes"""
+    batch = [request_queue.get()]
+    deadline = time.monotonic() + CONFIG['MAX_BATCH_DELAY_MS'] / 1000.0
     
-    generation_stats['last_generation'] = datetime.now().isoformat()
+    while len(batch) < CONFIG['MAX_BATCH']:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(request_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
     
-    # Update personality counts
-    if weapons:
-        for weapon in weapons:
-            personality = weapon.get('personality', 'unknown')
-            generation_stats['personality_counts'][personality] = generation_stats['personality_counts'].get(personality, 0) + 1
+    return batch
+
+def scenario_dispatch_loop():
+    """Collect queued scenario requests into batches and run them together"""
+    while True:
+        batch = collect_batch(scenario_queue)
+        
+        # Identical in-flight requests are generated once and shared
+        unique_payloads = {}
+        for payload, _, _ in batch:
+            unique_payloads.setdefault(scenario_cache_key(payload), payload)
+        
+        try:
+            with cuda_stream_context('text'):
+                results = text_generator.generate_weapon_scenarios_batch(list(unique_payloads.values()))
+            results_by_key = dict(zip(unique_payloads.keys(), results))
+            for payload, event, result_box in batch:
+                result_box['result'] = copy.deepcopy(results_by_key[scenario_cache_key(payload)])
+                event.set()
+        except Exception as e:
+            logger.error(f"Batched scenario generation failed: {e}")
+            for _, event, result_box in batch:
+                result_box['error'] = e
+                event.set()
+
+def model_dispatch_loop():
+    """Collect queued 3D model requests into batches and generate them in one GPU call"""
+    while True:
+        batch = collect_batch(model_queue)
+        
+        try:
+            try:
+                statuses = run_on_gpu(
+                    model_generator.generate_model_batch,
+                    descriptions=[payload['description'] for payload, _, _ in batch],
+                    output_paths=[payload['output_path'] for payload, _, _ in batch]
+                )
+            finally:
+                run_on_gpu(release_gpu_cache)
+            
+            for (_, event, result_box), success in zip(batch, statuses):
+                result_box['result'] = success
+                event.set()
+        except Exception as e:
+            logger.error(f"Batched 3D model generation failed: {e}")
+            for _, event, result_box in batch:
+                result_box['error'] = e
+                event.set()
+
+def scenario_cache_key(payload):
+    """Build the cache key for a scenario request payload"""
+    return (
+        payload['player1_personality'],
+        payload['player2_personality'],
+        payload['arena_theme'],
+        payload['num_weapons'],
+        payload['use_ai']
+    )
+
+def redis_scenario_key(key):
+    """Build the Redis key for a scenario cache key"""
+    return 'scenarios:' + ':'.join(str(part) for part in key)
+
+def get_cached_scenarios(key):
+    """Return a private copy of cached scenarios, or None on a miss or expiry"""
+    if redis_client is not None:
+        try:
+            data = redis_client.get(redis_scenario_key(key))
+        except redis.RedisError as e:
+            logger.warning(f"Scenario cache read failed: {e}")
+            return None
+        return orjson.loads(data) if data is not None else None
+    
+    with scenario_cache_lock:
+        entry = scenario_cache.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, scenarios = entry
+        if expires_at <= time.monotonic():
+            del scenario_cache[key]
+            return None
+        
+        scenario_cache.move_to_end(key)
+    
+    return copy.deepcopy(scenarios)
+
+def cache_scenarios(key, scenarios):
+    """Store scenarios in the LRU cache with a TTL, evicting the oldest entries"""
+    max_size = CONFIG['SCENARIO_CACHE_SIZE']
+    if max_size <= 0:
+        return
+    
+    if redis_client is not None:
+        try:
+            redis_client.set(redis_scenario_key(key), orjson.dumps(scenarios), ex=CONFIG['SCENARIO_CACHE_TTL'])
+        except redis.RedisError as e:
+            logger.warning(f"Scenario cache write failed: {e}")
+        return
+    
+    scenarios = copy.deepcopy(scenarios)
+    expires_at = time.monotonic() + CONFIG['SCENARIO_CACHE_TTL']
+    
+    with scenario_cache_lock:
+        scenario_cache[key] = (expires_at, scenarios)
+        scenario_cache.move_to_end(key)
+        while len(scenario_cache) > max_size:
+            scenario_cache.popitem(last=False)
+
+def cuda_stream_context(name):
+    """Context manager that routes CUDA work onto the named model stream"""
+    stream = cuda_streams.get(name)
+    return torch.cuda.stream(stream) if stream is not None else contextlib.nullcontext()
+
+def run_on_gpu(func, *args, **kwargs):
+    """Run a blocking model call on the dedicated GPU worker and wait for it"""
+    def call():
+        with cuda_stream_context('model'):
+            return func(*args, **kwargs)
+    
+    return GPU_EXECUTOR.submit(call).result()
+
+def release_gpu_cache():
+    """Return cached allocator blocks to the driver after a generation"""
+    if not CONFIG['EMPTY_CACHE_AFTER_BATCH'] or not torch.cuda.is_available():
+        return
+    
+    # The GPU worker process releases its own cache after each generation
+    if CONFIG['GPU_WORKER_ADDRESS']:
+        return
+    
+    gc.collect()
+    torch.cuda.synchronize()
+    torch.cuda.empty_cache()
+
+def queue_batched_requests(request_queue, payloads):
+    """Queue requests together so they share a batch window, returning their (event, result_box) pairs"""
+    pending = []
+    for payload in payloads:
+        event = threading.Event()
+        result_box = {}
+        request_queue.put((payload, event, result_box))
+        pending.append((event, result_box))
+    return pending
+
+def wait_batched_result(event, result_box, deadline):
+    """Wait until a queued request is done and return its result"""
+    if not event.wait(max(0, deadline - time.monotonic())):
+        raise TimeoutError('Timed out waiting for batched generation')
+    
+    if 'error' in result_box:
+        raise result_box['error']
+    
+    return result_box['result']
+
+def submit_batched_requests(request_queue, payloads, timeout):
+    """Queue requests together so they share a batch window, then wait for all results"""
+    pending = queue_batched_requests(request_queue, payloads)
+    deadline = time.monotonic() + timeout
+    return [wait_batched_result(event, result_box, deadline) for event, result_box in pending]
+
+def submit_batched_request(request_queue, payload, timeout):
+    """Queue a request for a batch dispatcher and wait for its result"""
+    return submit_batched_requests(request_queue, [payload], timeout)[0]
+
+def submit_scenario_request(payload):
+    """Queue a scenario request for the dispatcher and wait for its result"""
+    return submit_batched_request(scenario_queue, payload, CONFIG['BATCH_TIMEOUT'])
+
+def submit_model_request(description, output_path):
+    """Queue a single 3D model request so concurrent ones share a GPU batch"""
+    payload = {'description': description, 'output_path': output_path}
+    return submit_batched_request(model_queue, payload, CONFIG['MODEL_BATCH_TIMEOUT'])
+
+def submit_model_requests(descriptions, output_paths):
+    """Queue several 3D model requests at once and wait for all of them"""
+    payloads = [
+        {'description': description, 'output_path': output_path}
+        for description, output_path in zip(descriptions, output_paths)
+    ]
+    return submit_batched_requests(model_queue, payloads, CONFIG['MODEL_BATCH_TIMEOUT'])
 
 # ===============================
 # WEB INTERFACE ROUTES
@@ -103,14 +593,17 @@ def update_stats(weapons, generation_time, success=True):
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
-    return render_template('index.html', config=CONFIG, stats=generation_stats)
+    return render_template('index.html', config=CONFIG, stats=get_stats_snapshot())
 
 @app.route('/gallery')
 def gallery():
     """Model gallery page"""
-    # Get all generated weapons
-    weapons_data = get_all_weapons_data()
-    return render_template('gallery.html', weapons=weapons_data, stats=generation_stats)
+    # Get generated weapons, optionally one page at a time
+    weapons_data = get_all_weapons_data(
+        limit=request.args.get('limit', type=int),
+        offset=request.args.get('offset', 0, type=int)
+    )
+    return render_template('gallery.html', weapons=weapons_data, stats=get_stats_snapshot())
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
@@ -134,57 +627,25 @@ def health_check():
         'gpu_count': torch.cuda.device_count() if gpu_available else 0,
         'web_interface': CONFIG['WEB_INTERFACE_ENABLED'],
         'timestamp': time.time(),
-        'stats': generation_stats
+        'stats': get_stats_snapshot()
     })
 
 @app.route('/api/weapons/generate', methods=['POST'])
+@limit_in_flight
 def generate_weapons():
     """Generate 4 weapons based on player personalities"""
     try:
-        data = request.get_json()
-        
-        # Validate input
-        required_fields = ['player1_personality', 'player2_personality']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        player1_personality = data['player1_personality']
-        player2_personality = data['player2_personality']
-        arena_theme = data.get('arena_theme', 'medieval')
-        
-        logger.info(f"Generating weapons for personalities: {player1_personality} vs {player2_personality}")
-        
-        start_time = time.time()
-        
-        # Generate weapon scenarios using text model
-        weapon_scenarios = text_generator.generate_weapon_scenarios(
-            player1_personality=player1_personality,
-            player2_personality=player2_personality,
-            arena_theme=arena_theme,
-            num_weapons=CONFIG['MAX_WEAPONS_PER_REQUEST']
-        )
-        
-        # Generate file paths for 3D models
-        timestamp = int(time.time())
-        for i, weapon in enumerate(weapon_scenarios):
-            filename = f"weapon_{timestamp}_{i}.obj"
-            weapon['fileLocation'] = os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], filename)
-            weapon['webPath'] = f"/download/weapon/{filename}"
-            weapon['generatedAt'] = datetime.now().isoformat()
-        
-        generation_time = time.time() - start_time
-        
-        # Update statistics
-        generation_stats['arena_theme_counts'][arena_theme] = generation_stats['arena_theme_counts'].get(arena_theme, 0) + 1
-        update_stats(weapon_scenarios, generation_time, True)
+        try:
+            data = GenerateWeaponsRequest.model_validate_json(request.data)
+        except ValidationError as e:
+            return validation_error_response(e)
         
-        logger.success(f"Generated {len(weapon_scenarios)} weapon scenarios in {generation_time:.2f}s")
+        weapon_scenarios, generation_time, timestamp = generate_weapon_scenarios(data)
         
         return jsonify({
             'weapons': weapon_scenarios,
             'generation_time': generation_time,
-            'arena_theme': arena_theme,
+            'arena_theme': data.arena_theme,
             'timestamp': timestamp
         })
         
@@ -193,38 +654,96 @@ def generate_weapons():
         update_stats(None, 0, False)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/weapons/generate/stream', methods=['POST'])
+def generate_weapons_stream():
+    """Generate 4 weapons and stream them back as newline-delimited JSON, one weapon per line"""
+    try:
+        data = StreamWeaponsRequest.model_validate_json(request.data)
+    except ValidationError as e:
+        return validation_error_response(e)
+    
+    # The slot is held until the response is closed, since 3D generation runs inside the stream
+    if not in_flight_slots.acquire(blocking=False):
+        return server_busy_response()
+    
+    try:
+        weapon_scenarios, _, _ = generate_weapon_scenarios(data)
+    except Exception as e:
+        in_flight_slots.release()
+        logger.error(f"Error generating weapons: {e}")
+        update_stats(None, 0, False)
+        return jsonify({'error': str(e)}), 500
+    
+    # Scenarios for all 4 weapons come from one batched call, so the first line is only
+    # sent once they are all ready; the gain is in reporting 3D models as each finishes
+    response = Response(
+        stream_weapons(weapon_scenarios, data.create_models),
+        mimetype='application/x-ndjson'
+    )
+    # The server closes every response, even one whose client left before the body was read
+    response.call_on_close(in_flight_slots.release)
+    return response
+
+def stream_weapons(weapon_scenarios, create_models):
+    """Yield each weapon as a JSON line, then each again as its 3D model completes"""
+    try:
+        for weapon in weapon_scenarios:
+            yield orjson.dumps(weapon) + b'\n'
+        
+        if not create_models:
+            return
+        
+        # Queued together so they share GPU batches, but reported one by one as they finish
+        pending = queue_batched_requests(model_queue, [
+            {'description': weapon['description'], 'output_path': weapon['fileLocation']}
+            for weapon in weapon_scenarios
+        ])
+        deadline = time.monotonic() + CONFIG['MODEL_BATCH_TIMEOUT']
+        
+        for weapon, (event, result_box) in zip(weapon_scenarios, pending):
+            success = wait_batched_result(event, result_box, deadline)
+            if success:
+                index_weapon_file(
+                    weapon['fileLocation'],
+                    description=weapon['description'],
+                    personality=weapon.get('personality'),
+                    arena_theme=weapon.get('arena_theme')
+                )
+            weapon['modelStatus'] = 'completed' if success else 'failed'
+            yield orjson.dumps(weapon) + b'\n'
+    except Exception as e:
+        logger.error(f"Error streaming weapons: {e}")
+        yield orjson.dumps({'error': str(e)}) + b'\n'
+
 @app.route('/api/weapons/create-model', methods=['POST'])
+@limit_in_flight
 def create_3d_model():
     """Generate 3D model from weapon description"""
     try:
-        data = request.get_json()
-        
-        # Validate input
-        if 'description' not in data:
-            return jsonify({'error': 'Missing required field: description'}), 400
+        try:
+            data = CreateModelRequest.model_validate_json(request.data)
+        except ValidationError as e:
+            return validation_error_response(e)
         
-        description = data['description']
-        output_path = data.get('output_path')
+        description = data.description
+        output_path = data.output_path
         
         # Generate default path if not provided
         if not output_path:
-            timestamp = int(time.time())
-            filename = f"weapon_{timestamp}.obj"
+            filename = f"{weapon_file_stem(int(time.time()))}.obj"
             output_path = os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], filename)
         
         logger.info(f"Generating 3D model for: {description[:50]}...")
         
         start_time = time.time()
         
-        # Generate 3D model using Hunyuan3D-2
-        success = model_generator.generate_model(
-            description=description,
-            output_path=output_path
-        )
+        # Generate 3D model using Hunyuan3D-2 (batched with concurrent requests)
+        success = submit_model_request(description, output_path)
         
         generation_time = time.time() - start_time
         
         if success:
+            index_weapon_file(output_path, description=description)
             logger.success(f"3D model generated in {generation_time:.2f}s: {output_path}")
             return jsonify({
                 'status': 'completed',
@@ -241,44 +760,51 @@ def create_3d_model():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/weapons/batch-create', methods=['POST'])
+@limit_in_flight
 def batch_create_models():
     """Generate 3D models for multiple weapons"""
     try:
-        data = request.get_json()
+        try:
+            data = BatchCreateRequest.model_validate_json(request.data)
+        except ValidationError as e:
+            return validation_error_response(e)
         
-        if 'weapons' not in data:
-            return jsonify({'error': 'Missing required field: weapons'}), 400
-        
-        weapons = data['weapons']
+        weapons = data.weapons
         results = []
         
         logger.info(f"Batch generating {len(weapons)} 3D models...")
         
         start_time = time.time()
         
-        for i, weapon in enumerate(weapons):
-            logger.info(f"Processing weapon {i+1}/{len(weapons)}: {weapon.get('weaponName', 'Unknown')}")
-            
-            model_start_time = time.time()
-            
-            success = model_generator.generate_model(
-                description=weapon['description'],
-                output_path=weapon['fileLocation']
-            )
-            
-            model_generation_time = time.time() - model_start_time
-            
+        # Queue all models at once so they share GPU batches with concurrent requests
+        statuses = submit_model_requests(
+            [weapon.description for weapon in weapons],
+            [weapon.fileLocation for weapon in weapons]
+        )
+        
+        model_generation_time = (time.time() - start_time) / len(weapons) if weapons else 0
+        
+        for i, (weapon, success) in enumerate(zip(weapons, statuses)):
             results.append({
-                'weapon_name': weapon.get('weaponName', f'Weapon_{i}'),
+                'weapon_name': weapon.weaponName or f'Weapon_{i}',
                 'status': 'completed' if success else 'failed',
-                'model_path': weapon['fileLocation'] if success else None,
-                'web_path': weapon.get('webPath') if success else None,
+                'model_path': weapon.fileLocation if success else None,
+                'web_path': weapon.webPath if success else None,
                 'generation_time': model_generation_time
             })
         
         total_time = time.time() - start_time
         successful = sum(1 for r in results if r['status'] == 'completed')
         
+        for weapon, success in zip(weapons, statuses):
+            if success:
+                index_weapon_file(
+                    weapon.fileLocation,
+                    description=weapon.description,
+                    personality=getattr(weapon, 'personality', None),
+                    arena_theme=getattr(weapon, 'arena_theme', None)
+                )
+        
         logger.success(f"Batch generation completed in {total_time:.2f}s: {successful}/{len(weapons)} successful")
         
         return jsonify({
@@ -303,12 +829,56 @@ def batch_create_models():
 def list_weapons():
     """List all generated weapons"""
     try:
-        weapons_data = get_all_weapons_data()
-        return jsonify({
+        weapons_data = get_all_weapons_data(
+            limit=request.args.get('limit', type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        payload = {
             'weapons': weapons_data,
             'count': len(weapons_data),
-            'stats': generation_stats
+            'total': get_weapon_index().count(),
+            'stats': get_stats_snapshot()
+        }
+        
+        # Clients that send Accept: application/msgpack get a binary body
+        if MSGPACK_AVAILABLE and request.accept_mimetypes.best_match(
+                ['application/json', 'application/msgpack']) == 'application/msgpack':
+            response = Response(
+                ormsgpack.packb(payload, option=ormsgpack.OPT_NAIVE_UTC | ormsgpack.OPT_SERIALIZE_NUMPY),
+                mimetype='application/msgpack'
+            )
+        else:
+            response = jsonify(payload)
+        
+        response.vary.add('Accept')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/weapons/list.arrow', methods=['GET'])
+def list_weapons_arrow():
+    """List generated weapons as a columnar Arrow IPC stream"""
+    if not ARROW_AVAILABLE:
+        return jsonify({'error': 'Arrow output requires pyarrow'}), 501
+    
+    try:
+        filenames, sizes, created_at, modified_at = get_weapon_index().list_columns(
+            limit=request.args.get('limit', type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        
+        table = pa.table({
+            'filename': pa.array(filenames, type=pa.string()),
+            'size': pa.array(sizes, type=pa.int64()),
+            'created_at': pa.array(created_at, type=pa.float64()),
+            'modified_at': pa.array(modified_at, type=pa.float64())
         })
+        
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        
+        return Response(sink.getvalue().to_pybytes(), mimetype='application/vnd.apache.arrow.stream')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -316,18 +886,9 @@ def list_weapons():
 def get_stats():
     """Get generation statistics"""
     try:
-        # Add file system stats
-        weapon_files = glob.glob(os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], '*.obj'))
-        file_stats = {
-            'total_files': len(weapon_files),
-            'total_size': sum(os.path.getsize(f) for f in weapon_files),
-            'oldest_file': min(weapon_files, key=os.path.getctime) if weapon_files else None,
-            'newest_file': max(weapon_files, key=os.path.getctime) if weapon_files else None
-        }
-        
         return jsonify({
-            'generation_stats': generation_stats,
-            'file_stats': file_stats,
+            'generation_stats': get_stats_snapshot(),
+            'file_stats': get_file_stats(),
             'system_stats': {
                 'gpu_available': torch.cuda.is_available(),
                 'models_loaded': text_generator is not None and model_generator is not None
@@ -345,6 +906,7 @@ def delete_weapon(weapon_id):
         
         if os.path.exists(weapon_file):
             os.remove(weapon_file)
+            unindex_weapon_file(weapon_file)
             logger.info(f"Deleted weapon: {weapon_id}")
             return jsonify({'success': True, 'message': f'Weapon {weapon_id} deleted'})
         else:
@@ -362,7 +924,15 @@ def delete_weapon(weapon_id):
 def download_weapon(filename):
     """Download individual weapon file"""
     try:
-        return send_from_directory(CONFIG['WEAPON_OUTPUT_DIR'], filename, as_attachment=True)
+        # Weapon files are written once under unique names, so clients may keep them
+        response = send_from_directory(
+            CONFIG['WEAPON_OUTPUT_DIR'], filename,
+            as_attachment=True,
+            max_age=CONFIG['DOWNLOAD_MAX_AGE']
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
 
@@ -370,17 +940,32 @@ def download_weapon(filename):
 def download_batch():
     """Download all weapons as ZIP file"""
     try:
+        weapons = get_all_weapons_data()
+        
+        # Identical weapon sets produce identical archives
+        etag = weapons_zip_etag(weapons)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
         zip_filename = f"aeon_weapons_{int(time.time())}.zip"
-        zip_path = os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], zip_filename)
+        cache_path = os.path.join(CONFIG['ZIP_CACHE_DIR'], f"weapons_{etag}.zip")
         
-        # Create ZIP file with all weapons
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            weapon_files = glob.glob(os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], '*.obj'))
-            for file_path in weapon_files:
-                filename = os.path.basename(file_path)
-                zipf.write(file_path, filename)
+        # Reuse the archive built for this exact set of weapons
+        if os.path.exists(cache_path):
+            return send_file(cache_path, as_attachment=True, download_name=zip_filename, etag=etag)
         
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
+        weapon_files = [(weapon['file_path'], weapon['filename']) for weapon in weapons]
+        
+        # Stream the archive as it is built, keeping a copy for later requests
+        response = Response(
+            stream_weapons_zip(weapon_files, cache_path=cache_path),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'}
+        )
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         logger.error(f"Error creating batch download: {e}")
@@ -390,27 +975,179 @@ def download_batch():
 # UTILITY FUNCTIONS
 # ===============================
 
-def get_all_weapons_data():
-    """Get data for all generated weapons"""
-    weapons_data = []
-    weapon_files = glob.glob(os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], '*.obj'))
-    
-    for file_path in weapon_files:
-        filename = os.path.basename(file_path)
-        file_stats = os.stat(file_path)
-        
-        weapons_data.append({
-            'filename': filename,
-            'file_path': file_path,
-            'web_path': f"/download/weapon/{filename}",
-            'size': file_stats.st_size,
-            'created_at': datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-            'modified_at': datetime.fromtimestamp(file_stats.st_mtime).isoformat()
-        })
+def generate_weapon_scenarios(data):
+    """Generate (or fetch cached) weapon scenarios for a request and assign their output files"""
+    player1_personality = data.player1_personality
+    player2_personality = data.player2_personality
+    arena_theme = data.arena_theme
+    
+    logger.info(f"Generating weapons for personalities: {player1_personality} vs {player2_personality}")
     
-    # Sort by creation time (newest first)
-    weapons_data.sort(key=lambda x: x['created_at'], reverse=True)
-    return weapons_data
+    start_time = time.time()
+    
+    scenario_payload = {
+        'player1_personality': player1_personality,
+        'player2_personality': player2_personality,
+        'arena_theme': arena_theme,
+        'num_weapons': CONFIG['MAX_WEAPONS_PER_REQUEST'],
+        'use_ai': data.use_ai
+    }
+    cache_key = scenario_cache_key(scenario_payload)
+    
+    # Generate weapon scenarios using text model (batched with concurrent requests)
+    weapon_scenarios = get_cached_scenarios(cache_key)
+    if weapon_scenarios is None:
+        weapon_scenarios = submit_scenario_request(scenario_payload)
+        cache_scenarios(cache_key, weapon_scenarios)
+    else:
+        logger.info("Using cached weapon scenarios")
+    
+    # Generate file paths for 3D models
+    timestamp = int(time.time())
+    file_stem = weapon_file_stem(timestamp)
+    for i, weapon in enumerate(weapon_scenarios):
+        filename = f"{file_stem}_{i}.obj"
+        weapon['fileLocation'] = os.path.join(CONFIG['WEAPON_OUTPUT_DIR'], filename)
+        weapon['webPath'] = f"/download/weapon/{filename}"
+        weapon['generatedAt'] = datetime.now().isoformat()
+    
+    generation_time = time.time() - start_time
+    
+    # Update statistics
+    update_stats(weapon_scenarios, generation_time, True, arena_theme=arena_theme)
+    
+    logger.success(f"Generated {len(weapon_scenarios)} weapon scenarios in {generation_time:.2f}s")
+    
+    return weapon_scenarios, generation_time, timestamp
+
+def weapon_file_stem(timestamp):
+    """Build a unique file name stem for newly generated weapons"""
+    return f"weapon_{timestamp}_{os.getpid()}_{next(weapon_file_counter)}"
+
+def get_weapon_index():
+    """Get the weapon index, resyncing it if the output directory changed outside the API"""
+    global weapon_index
+    
+    output_dir = CONFIG['WEAPON_OUTPUT_DIR']
+    
+    with weapon_index_lock:
+        if weapon_index is None:
+            weapon_index = WeaponIndex(output_dir, CONFIG['WEAPON_INDEX_PATH'])
+        
+        # API writes are recorded as they happen, but they also change the directory mtime:
+        # after the startup sync, rescan for outside changes at most once per interval
+        dir_mtime = os.stat(output_dir).st_mtime_ns
+        now = time.monotonic()
+        if _index_state['dir_mtime'] is None or (
+            dir_mtime != _index_state['dir_mtime']
+            and now - _index_state['synced_at'] >= CONFIG['INDEX_RESYNC_INTERVAL']
+        ):
+            weapon_index.sync()
+            _index_state['dir_mtime'] = dir_mtime
+            _index_state['synced_at'] = now
+    
+    return weapon_index
+
+def index_weapon_file(file_path, description=None, personality=None, arena_theme=None):
+    """Record a weapon file written by the API, with its generation metadata"""
+    output_dir = os.path.abspath(CONFIG['WEAPON_OUTPUT_DIR'])
+    if os.path.dirname(os.path.abspath(file_path)) != output_dir:
+        return
+    
+    # The index is authoritative for API writes; outside changes are left to the periodic resync
+    index = weapon_index if _index_state['dir_mtime'] is not None else get_weapon_index()
+    index.record(file_path, description=description, personality=personality, arena_theme=arena_theme)
+
+def unindex_weapon_file(file_path):
+    """Drop a weapon file deleted by the API from the index"""
+    index = weapon_index if _index_state['dir_mtime'] is not None else get_weapon_index()
+    index.remove(os.path.basename(file_path))
+
+def get_all_weapons_data(limit=None, offset=0):
+    """Get data for generated weapons, newest first"""
+    return get_weapon_index().list_weapons(limit=limit, offset=offset)
+
+def get_file_stats():
+    """Get file system stats for generated weapons from the index"""
+    return get_weapon_index().get_stats()
+
+def weapons_zip_etag(weapons):
+    """Build an ETag for the batch archive from its member names, sizes and mtimes"""
+    signature = sorted((weapon['filename'], weapon['size'], weapon['modified_at']) for weapon in weapons)
+    return hashlib.md5(repr(signature).encode()).hexdigest()
+
+class ZipStreamBuffer:
+    """Write-only file object that collects ZIP output until it is drained"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_weapons_zip(weapon_files, cache_path=None):
+    """Yield a ZIP archive of weapon files chunk by chunk, optionally saving it to cache_path"""
+    buffer = ZipStreamBuffer()
+    cache_file = None
+    completed = False
+    
+    if cache_path:
+        cache_file = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(cache_path), suffix='.tmp', delete=False
+        )
+    
+    def emit():
+        chunk = buffer.drain()
+        if cache_file:
+            cache_file.write(chunk)
+        return chunk
+    
+    try:
+        # .obj entries are stored uncompressed: the archive is a bulk transport
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zipf:
+            for file_path, filename in weapon_files:
+                try:
+                    zipf.write(file_path, filename)
+                except FileNotFoundError:
+                    logger.warning(f"Skipping weapon removed during download: {filename}")
+                    continue
+                yield emit()
+        
+        final_chunk = emit()
+        completed = True
+        yield final_chunk
+        
+    finally:
+        if cache_file:
+            cache_file.close()
+            if completed:
+                publish_zip_archive(cache_file.name, cache_path)
+            else:
+                os.unlink(cache_file.name)
+
+def publish_zip_archive(tmp_path, cache_path):
+    """Atomically move a finished archive into place and drop stale ones"""
+    os.replace(tmp_path, cache_path)
+    
+    cache_name = os.path.basename(cache_path)
+    with os.scandir(os.path.dirname(cache_path)) as entries:
+        for entry in entries:
+            if entry.name.endswith('.zip') and entry.name != cache_name:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+    
+    logger.info(f"Cached batch archive: {cache_name}")
 
 @app.route('/api/models/reload', methods=['POST'])
 def reload_models():
@@ -428,6 +1165,22 @@ def reload_models():
         logger.error(f"Error reloading models: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cache/clear', methods=['POST'])
+def clear_scenario_cache():
+    """Clear cached weapon scenarios"""
+    with scenario_cache_lock:
+        cleared = len(scenario_cache)
+        scenario_cache.clear()
+    
+    if redis_client is not None:
+        keys = list(redis_client.scan_iter('scenarios:*'))
+        if keys:
+            redis_client.delete(*keys)
+        cleared += len(keys)
+    
+    logger.info(f"Cleared {cleared} cached scenario entries")
+    return jsonify({'success': True, 'cleared': cleared})
+
 # ===============================
 # ERROR HANDLERS
 # ===============================
@@ -467,5 +1220,6 @@ if __name__ == '__main__':
     app.run(
         host='0.0.0.0',
         port=CONFIG['API_PORT'],
-        debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+        debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true',
+        threaded=True
     )
\ No newline at end of file
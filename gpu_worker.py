@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+GPU Worker
+Owns the AI models in a single process and serves them to HTTP workers over a Unix socket
+"""
+
+import os
+import gc
+import time
+import queue
+import threading
+from multiprocessing.connection import Listener, Client
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+import torch
+
+# Same process-wide settings as app.py: the GPU worker never imports it
+torch.backends.cudnn.benchmark = True
+torch.set_float32_matmul_precision('high')
+
+from models.text_generator import WeaponTextGenerator
+from models.model_generator import WeaponModelGenerator
+
+# Methods HTTP workers may call on each generator
+ALLOWED_METHODS = {
+    'text': {'generate_weapon_scenarios', 'generate_weapon_scenarios_batch', 'get_supported_personalities'},
+    'model': {'generate_model', 'generate_model_batch', 'get_model_info', 'clear_cache'}
+}
+
+# List-in/list-out methods whose concurrent calls from different HTTP workers are
+# merged into one call, with the names of their list arguments in positional order
+MERGEABLE_METHODS = {
+    ('text', 'generate_weapon_scenarios_batch'): ('requests',),
+    ('model', 'generate_model_batch'): ('descriptions', 'output_paths')
+}
+
+class RemoteGenerator:
+    """Proxy that forwards generator method calls to the GPU worker process"""
+    
+    def __init__(self, address: str, target: str, authkey: bytes):
+        self.address = address
+        self.target = target
+        self.authkey = authkey
+        self._local = threading.local()
+    
+    def _connection(self):
+        """Get this thread's connection to the GPU worker, connecting on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+    
+    def _call(self, method: str, *args, **kwargs):
+        conn = self._connection()
+        try:
+            conn.send((self.target, method, args, kwargs))
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            # Worker restarted: drop the stale connection so the next call reconnects
+            self._local.conn = None
+            raise
+        
+        if status == 'error':
+            raise RuntimeError(f"GPU worker error in {self.target}.{method}: {result}")
+        return result
+    
+    def __getattr__(self, method: str):
+        if method.startswith('_') or method not in ALLOWED_METHODS[self.target]:
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+
+class GPUWorker:
+    """Loads both generators once and executes calls from any number of HTTP workers"""
+    
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.generators = {}
+        # One lock per model keeps each model's GPU work serialized across clients
+        self.locks = {'text': threading.Lock(), 'model': threading.Lock()}
+        self.empty_cache_after_call = os.getenv('EMPTY_CACHE_AFTER_BATCH', 'True').lower() == 'true'
+        self.max_batch_calls = int(os.getenv('MAX_BATCH', 8))
+        self.max_batch_delay = int(os.getenv('MAX_BATCH_DELAY_MS', 10)) / 1000.0
+        self.merge_queues = {key: queue.Queue() for key in MERGEABLE_METHODS}
+        # Same budgets as the app's scenario and 3D model dispatchers
+        self.merge_timeouts = {
+            'text': int(os.getenv('BATCH_TIMEOUT', 120)),
+            'model': int(os.getenv('MODEL_BATCH_TIMEOUT', 600))
+        }
+    
+    def load_models(self):
+        """Load and warm up both generators"""
+        logger.info("Loading AI models in GPU worker...")
+        
+        warmup_iterations = int(os.getenv('WARMUP_ITERATIONS', 2))
+        compile_models = os.getenv('COMPILE_MODELS', 'False').lower() == 'true'
+        
+        self.generators['text'] = WeaponTextGenerator(
+            model_dtype=os.getenv('MODEL_DTYPE', 'auto'),
+            compile_model=compile_models,
+            onnx_path=os.getenv('TEXT_MODEL_ONNX_PATH'),
+            sample_descriptions=os.getenv('SAMPLE_DESCRIPTIONS', 'True').lower() == 'true',
+            ai_description_rate=float(os.getenv('AEON_AI_DESC_RATE', 0.25))
+        )
+        self.generators['model'] = WeaponModelGenerator(compile_model=compile_models)
+        
+        if warmup_iterations > 0:
+            self.generators['text'].warmup(warmup_iterations)
+            self.generators['model'].warmup(warmup_iterations)
+        
+        logger.success("GPU worker models loaded")
+    
+    def handle(self, conn):
+        """Serve calls from one HTTP worker connection until it closes"""
+        try:
+            while True:
+                try:
+                    target, method, args, kwargs = conn.recv()
+                except EOFError:
+                    break
+                
+                if method not in ALLOWED_METHODS.get(target, ()):
+                    conn.send(('error', f"Unknown method: {target}.{method}"))
+                    continue
+                
+                try:
+                    if (target, method) in MERGEABLE_METHODS:
+                        result = self.submit_merged(target, method, args, kwargs)
+                    else:
+                        result = self.execute(target, method, args, kwargs)
+                    conn.send(('ok', result))
+                except Exception as e:
+                    logger.error(f"Error in {target}.{method}: {e}")
+                    conn.send(('error', str(e)))
+        finally:
+            conn.close()
+    
+    def execute(self, target, method, args, kwargs):
+        """Run one generator call with that model's lock held"""
+        with self.locks[target]:
+            result = getattr(self.generators[target], method)(*args, **kwargs)
+            if target == 'model':
+                self.release_gpu_cache()
+        return result
+    
+    def submit_merged(self, target, method, args, kwargs):
+        """Queue a mergeable call for its batch loop and wait for this caller's share"""
+        call_args = dict(zip(MERGEABLE_METHODS[(target, method)], args))
+        call_args.update(kwargs)
+        
+        event = threading.Event()
+        result_box = {}
+        self.merge_queues[(target, method)].put((call_args, event, result_box))
+        
+        # A dead merge loop must not hang this connection, and the HTTP worker blocked on it
+        if not event.wait(self.merge_timeouts[target]):
+            raise TimeoutError(f"Timed out waiting for merged {target}.{method}")
+        
+        if 'error' in result_box:
+            raise result_box['error']
+        return result_box['result']
+    
+    def merge_loop(self, target, method):
+        """Merge concurrent list calls from all clients into single generator calls"""
+        fields = MERGEABLE_METHODS[(target, method)]
+        merge_queue = self.merge_queues[(target, method)]
+        
+        while True:
+            # Block for the first call, then gather more until the batch window closes
+            batch = [merge_queue.get()]
+            deadline = time.monotonic() + self.max_batch_delay
+            
+            while len(batch) < self.max_batch_calls:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(merge_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            merged = {field: [item for call_args, _, _ in batch for item in call_args[field]] for field in fields}
+            
+            try:
+                results = self.execute(target, method, (), merged)
+                
+                # Hand each caller the slice of results for its own items
+                offset = 0
+                for call_args, event, result_box in batch:
+                    count = len(call_args[fields[0]])
+                    result_box['result'] = results[offset:offset + count]
+                    offset += count
+                    event.set()
+            except Exception as e:
+                for _, event, result_box in batch:
+                    result_box['error'] = e
+                    event.set()
+    
+    def release_gpu_cache(self):
+        """Return cached allocator blocks to the driver after a 3D generation"""
+        if not self.empty_cache_after_call or not torch.cuda.is_available():
+            return
+        
+        gc.collect()
+        torch.cuda.synchronize()
+        torch.cuda.empty_cache()
+    
+    def serve_forever(self):
+        """Accept HTTP worker connections, one thread per connection"""
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        
+        for target, method in MERGEABLE_METHODS:
+            threading.Thread(
+                target=self.merge_loop,
+                args=(target, method),
+                name=f'merge-{target}-{method}',
+                daemon=True
+            ).start()
+        
+        with Listener(self.address, family='AF_UNIX', authkey=self.authkey) as listener:
+            logger.info(f"GPU worker listening on {self.address}")
+            
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Rejected GPU worker connection: {e}")
+                    continue
+                
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+if __name__ == '__main__':
+    address = os.getenv('GPU_WORKER_ADDRESS', './gpu.sock')
+    authkey = os.getenv('GPU_WORKER_AUTHKEY', 'aeon-weapon-ai').encode()
+    
+    worker = GPUWorker(address, authkey)
+    worker.load_models()
+    worker.serve_forever()
@@ -5,19 +5,122 @@ Generates weapon scenarios based on player personalities
 """
 
 import os
+import sys
 import json
 import random
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from loguru import logger
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 
+# Decode budget for the static KV cache: prompt tokens plus generated tokens
+STATIC_CACHE_LEN = 128
+
+# Only the first sentence of a generated description is kept
+MAX_NEW_TOKENS = 40
+MIN_NEW_TOKENS = 4
+
+# With a static cache, prompts are left-padded to one length so every batch reuses the same shapes
+STATIC_PROMPT_LEN = STATIC_CACHE_LEN - MAX_NEW_TOKENS
+
+# Compiled batches are padded to a power-of-two row count; warmup captures the graph for each
+# of them, up to the default MAX_BATCH of 8 requests with 4 weapons each
+COMPILE_WARMUP_ROWS = (1, 2, 4, 8, 16, 32)
+
+# Fixed spans of the description prompt, tokenized once at load time; the variable
+# fields slot in between them: descriptor, weapon_type, material, effect, arena_theme
+PROMPT_SPANS = ("A", " made of", " with", " effects in a", " arena. This legendary weapon")
+
+def cpu_supports_bf16() -> bool:
+    """Check for native bfloat16 matmuls on this CPU (AVX512-BF16)"""
+    is_supported = getattr(torch.cpu, '_is_avx512_bf16_supported', None)
+    return bool(is_supported and is_supported())
+
+# Component lists of a personality template, read-only once loaded
+COMPONENT_FIELDS = ('weapon_types', 'materials', 'effects', 'descriptors')
+
+# Rolled stats, in the column order of the stat arrays, and their clip bounds
+STAT_FIELDS = ('damage', 'speed')
+STAT_MIN = np.array([20, 10])
+STAT_MAX = 100
+
+def freeze_template(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a template's component lists as tuples of interned strings and its stat modifiers as one array"""
+    frozen = dict(template)
+    for field in COMPONENT_FIELDS:
+        if field in frozen:
+            frozen[field] = tuple(sys.intern(value) for value in frozen[field])
+    # float64, like the Python floats of the scalar path, so truncated stats stay identical
+    frozen['stat_modifiers'] = np.array([frozen.get(f'{stat}_modifier', 1.0) for stat in STAT_FIELDS])
+    return frozen
+
+# Generated descriptions kept per (descriptor, weapon_type, material, effect, arena_theme)
+DESCRIPTION_CACHE_SIZE = 4096
+
+# Upper bound on remembered prompt field tokenizations
+FIELD_TOKEN_CACHE_SIZE = 8192
+
+# Shared generator for vectorized stat rolls
+RNG = np.random.default_rng()
+
+# Arena-specific elements for template descriptions
+ARENA_ELEMENTS = {
+    'volcanic': ('molten lava', 'volcanic ash', 'burning rocks', 'fire', 'heat'),
+    'ice': ('frozen crystals', 'icy winds', 'frost', 'glacial power', 'frozen essence'),
+    'forest': ('ancient trees', 'natural magic', 'forest spirits', 'living wood', 'nature\'s power'),
+    'medieval': ('ancient runes', 'battle-tested steel', 'warrior\'s honor', 'knightly valor', 'old magic'),
+    'shadow': ('dark energy', 'shadow essence', 'void power', 'darkness', 'nightmare fuel'),
+    'desert': ('sand storms', 'scorching heat', 'mirage magic', 'desert winds', 'ancient sands')
+}
+
+# Weapon naming patterns, called with (weapon_type, material, effect, descriptor)
+WEAPON_NAME_PATTERNS = (
+    lambda weapon_type, material, effect, descriptor: f"{descriptor.title()} {weapon_type.title()} of {effect.title()}",
+    lambda weapon_type, material, effect, descriptor: f"{material.title()} {weapon_type.title()}",
+    lambda weapon_type, material, effect, descriptor: f"{effect.title()} {descriptor} {weapon_type}",
+    lambda weapon_type, material, effect, descriptor: f"The {descriptor.title()} {weapon_type.title()}",
+    lambda weapon_type, material, effect, descriptor: f"{material.title()} {effect.title()} {weapon_type.title()}",
+    lambda weapon_type, material, effect, descriptor: f"{effect.title()}-{descriptor} {weapon_type}",
+    lambda weapon_type, material, effect, descriptor: f"{descriptor.title()} {material} {weapon_type}"
+)
+
+# Fallback description templates, filled with str.format_map
+DESCRIPTION_TEMPLATES = (
+    "A {descriptor} {weapon_type} forged from {material}, crackling with {effect} energy and infused with {arena_element}.",
+    "This {material} {weapon_type} radiates {effect} power, its {descriptor} form designed for devastating attacks in {arena_theme} combat.",
+    "Crafted from finest {material}, this {descriptor} {weapon_type} channels {effect} forces and draws strength from {arena_element}.",
+    "A legendary {weapon_type} of {material} construction, imbued with {effect} magic and empowered by {arena_element}.",
+    "The {descriptor} surface of this {material} {weapon_type} glows with {effect} energy, enhanced by the power of {arena_element}.",
+    "Forged in the heart of {arena_theme} lands, this {descriptor} {weapon_type} combines {material} with {effect} magic.",
+    "A {descriptor} {weapon_type} that pulses with {effect} energy, its {material} core resonating with {arena_element}.",
+    "This ancient {weapon_type} of {material} bears the mark of {effect} magic and the essence of {arena_element}."
+)
+
 class WeaponTextGenerator:
     """Generates weapon descriptions based on player personalities"""
     
-    def __init__(self):
+    def __init__(self, model_dtype: str = 'auto', compile_model: bool = False,
+                 onnx_path: Optional[str] = None, sample_descriptions: bool = True,
+                 ai_description_rate: float = 1.0):
         self.model = None
         self.tokenizer = None
+        self.model_dtype = model_dtype.lower()
+        self.device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+        self.use_cuda = self.device.type == 'cuda'
+        self.compile_model = compile_model
+        self.onnx_path = onnx_path
+        self.sample_descriptions = sample_descriptions
+        # Share of weapons described by the model; the rest use the fallback templates
+        self.ai_description_rate = ai_description_rate
+        self.use_static_cache = False
+        self.stop_token_ids = None
+        self.prompt_span_ids = None
+        self.field_token_ids = {}
+        self.description_cache = OrderedDict()
+        self.description_cache_lock = threading.Lock()
         self.personality_templates = {}
         self.weapon_stats_ranges = {
             'damage': (30, 100),
@@ -86,6 +189,10 @@ class WeaponTextGenerator:
                 logger.info("Loaded personality templates from config file")
             except Exception as e:
                 logger.warning(f"Failed to load personality config: {e}")
+        
+        self.personality_templates = {
+            name: freeze_template(template) for name, template in self.personality_templates.items()
+        }
     
     def _initialize_model(self):
         """Initialize the text generation model"""
@@ -95,17 +202,45 @@ class WeaponTextGenerator:
             
             logger.info(f"Loading text generation model: {model_name}")
             
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                device_map="auto" if torch.cuda.is_available() else None
-            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            if not self.tokenizer.is_fast:
+                logger.warning("Rust tokenizer not available, prompt tokenization will be slow")
+            
+            if self.onnx_path:
+                self.model = self._load_onnx_model()
+            
+            if self.model is None:
+                # Pin the whole model to one device: a single-device map places the weights
+                # (quantized ones included) without accelerate's per-forward dispatch hooks
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    model_name,
+                    device_map={'': self.device} if self.use_cuda else None,
+                    **self._get_load_kwargs()
+                )
+                
+                if self.model_dtype == 'int8' and not self.use_cuda:
+                    self._quantize_for_cpu()
             
             # Add padding token if it doesn't exist
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
             
+            # Decoder-only models continue from the last position, so batches pad on the left
+            self.tokenizer.padding_side = 'left'
+            
+            # Byte-level BPE splits before spaces, so the fixed spans tokenize the same alone
+            self.prompt_span_ids = [self.tokenizer.encode(span) for span in PROMPT_SPANS]
+            self._precompute_field_token_ids()
+            
+            # Stop decoding at the end of the first sentence
+            self.stop_token_ids = [self.tokenizer.eos_token_id] + [
+                token_id for token, token_id in self.tokenizer.get_vocab().items()
+                if token.rstrip().endswith('.')
+            ]
+            
+            if self.compile_model and not self.onnx_path:
+                self._compile_model()
+            
             logger.success("Text generation model loaded successfully")
             
         except Exception as e:
@@ -113,54 +248,253 @@ class WeaponTextGenerator:
             self.model = None
             self.tokenizer = None
     
-    def generate_weapon_scenarios(self, player1_personality: str, player2_personality: str, 
-                                arena_theme: str = "medieval", num_weapons: int = 4) -> List[Dict[str, Any]]:
-        """Generate weapon scenarios based on player personalities"""
+    def _precompute_field_token_ids(self):
+        """Tokenize every known prompt field value once, so requests only splice ids"""
+        fields = set(f" {arena_theme}" for arena_theme in ARENA_ELEMENTS)
+        for template in self.personality_templates.values():
+            fields.update(f" {material}" for material in template['materials'])
+            fields.update(f" {effect}" for effect in template['effects'])
+            fields.update(
+                f" {descriptor} {weapon_type}"
+                for descriptor in template['descriptors']
+                for weapon_type in template['weapon_types']
+            )
         
-        weapons = []
+        # One batched call: the Rust tokenizer encodes the whole list across native threads
+        fields = list(fields)
+        self.field_token_ids = dict(zip(fields, self.tokenizer(fields)['input_ids']))
+    
+    def _encode_field(self, field: str) -> List[int]:
+        """Get the token ids for a prompt field, tokenizing values not seen before"""
+        token_ids = self.field_token_ids.get(field)
+        if token_ids is None:
+            # Custom arena themes and templates added after load; arena themes come from
+            # clients, so stop remembering new values once the table is full
+            token_ids = self.tokenizer.encode(field)
+            if len(self.field_token_ids) < FIELD_TOKEN_CACHE_SIZE:
+                self.field_token_ids[field] = token_ids
+        return token_ids
+    
+    def _load_onnx_model(self):
+        """Load a pre-exported ONNX model with ONNX Runtime, or None if unavailable"""
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            logger.warning("optimum[onnxruntime] not available, falling back to PyTorch text model")
+            self.onnx_path = None
+            return None
         
-        # Generate 2 weapons for each player
-        for player_num in [1, 2]:
-            personality = player1_personality if player_num == 1 else player2_personality
-            
-            for i in range(2):
-                weapon = self._generate_single_weapon(personality, arena_theme, player_num)
-                weapons.append(weapon)
+        # IO binding keeps inputs, outputs and the KV cache on the GPU between decode steps
+        model = ORTModelForCausalLM.from_pretrained(
+            self.onnx_path,
+            provider='CUDAExecutionProvider' if self.use_cuda else 'CPUExecutionProvider',
+            use_io_binding=self.use_cuda,
+            use_cache=True
+        )
         
-        return weapons
+        logger.info(f"Loaded ONNX Runtime text model from {self.onnx_path}")
+        return model
     
-    def _generate_single_weapon(self, personality: str, arena_theme: str, player: int) -> Dict[str, Any]:
-        """Generate a single weapon based on personality"""
+    def _compile_model(self):
+        """Compile the decoder forward pass so decode steps replay a captured CUDA graph"""
+        if not self.use_cuda:
+            logger.info("Skipping torch.compile: CUDA graphs need a GPU")
+            return
         
-        # Get personality template or use default
-        template = self.personality_templates.get(personality, self.personality_templates['aggressive_warrior'])
+        if self.model_dtype in ('int8', 'int4'):
+            logger.info("Skipping torch.compile: not supported for bitsandbytes-quantized models")
+            return
         
-        # Select random components
-        weapon_type = random.choice(template['weapon_types'])
-        material = random.choice(template['materials'])
-        effect = random.choice(template['effects'])
-        descriptor = random.choice(template['descriptors'])
+        # A static KV cache, allocated by generate() once per batch size and reused, keeps
+        # every decode step the same shape so each graph is captured once and replayed
+        self.use_static_cache = True
+        self.model.generation_config.cache_implementation = 'static'
+        self.model.forward = torch.compile(
+            self.model.forward,
+            mode='reduce-overhead',
+            fullgraph=False,
+            dynamic=False
+        )
         
-        # Generate weapon name
-        weapon_name = self._generate_weapon_name(weapon_type, material, effect, descriptor)
+        logger.info("Text generation model compiled (graphs are captured during warmup)")
+    
+    def _quantize_for_cpu(self):
+        """Apply dynamic int8 quantization to the model's Linear layers for CPU decode"""
+        # GPT-2 blocks use transformers' Conv1D, so on distilgpt2 this covers the LM head,
+        # the single largest matmul of every decode step
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Text generation model quantized to int8 for CPU")
+    
+    def _get_load_kwargs(self) -> Dict[str, Any]:
+        """Map the configured model dtype to from_pretrained() arguments"""
         
-        # Generate description using template-based approach or AI model
-        description = self._generate_description(weapon_name, weapon_type, material, effect, descriptor, arena_theme)
+        if not self.use_cuda:
+            # bitsandbytes is GPU-only (int8 is quantized after loading instead), and bf16
+            # only beats fp32 on CPUs that have native bf16 matmuls
+            if self.model_dtype in ('auto', 'bf16') and cpu_supports_bf16():
+                return {'torch_dtype': torch.bfloat16}
+            return {'torch_dtype': torch.float32}
         
-        # Calculate stats based on personality modifiers
-        base_damage = random.randint(*self.weapon_stats_ranges['damage'])
-        base_speed = random.randint(*self.weapon_stats_ranges['speed'])
+        # Decode is memory-bandwidth bound: fewer bytes per weight means faster tokens
+        half_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        dtypes = {
+            'auto': half_dtype,
+            'bf16': torch.bfloat16,
+            'fp16': torch.float16,
+            'fp32': torch.float32
+        }
         
-        damage = int(base_damage * template['damage_modifier'])
-        speed = int(base_speed * template['speed_modifier'])
+        if self.model_dtype in dtypes:
+            return {'torch_dtype': dtypes[self.model_dtype]}
+        
+        if self.model_dtype in ('int8', 'int4'):
+            try:
+                from transformers import BitsAndBytesConfig
+                import bitsandbytes  # noqa: F401
+            except ImportError:
+                logger.warning(f"bitsandbytes not available, loading text model as {half_dtype} instead of {self.model_dtype}")
+                return {'torch_dtype': half_dtype}
+            
+            if self.model_dtype == 'int8':
+                quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+            else:
+                # NF4 with double quantization: best 4-bit quality at the smallest footprint
+                quantization_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type='nf4',
+                    bnb_4bit_compute_dtype=half_dtype,
+                    bnb_4bit_use_double_quant=True
+                )
+            
+            return {'quantization_config': quantization_config}
+        
+        if self.model_dtype == 'fp8':
+            # FP8 tensor cores exist from Ada / Hopper (compute capability 8.9) on
+            if torch.cuda.get_device_capability() < (8, 9):
+                logger.warning(f"FP8 needs an Ada or Hopper GPU, loading text model as {half_dtype}")
+                return {'torch_dtype': half_dtype}
+            
+            try:
+                from transformers import FineGrainedFP8Config
+            except ImportError:
+                logger.warning(f"FP8 quantization needs a newer transformers, loading text model as {half_dtype}")
+                return {'torch_dtype': half_dtype}
+            
+            return {'quantization_config': FineGrainedFP8Config()}
+        
+        logger.warning(f"Unknown model dtype '{self.model_dtype}', using {half_dtype}")
+        return {'torch_dtype': half_dtype}
+    
+    def warmup(self, iterations: int = 1):
+        """Run dummy generations so kernel selection happens before serving"""
+        personalities = self.get_supported_personalities()
+        player1, player2 = personalities[0], personalities[-1]
+        
+        logger.info(f"Warming up text generation model ({iterations} iteration(s))...")
+        
+        request = {'player1_personality': player1, 'player2_personality': player2,
+                   'arena_theme': 'medieval', 'use_ai': False}
+        
+        # A compiled model captures one graph per batch shape: pay for all of them now. The model
+        # is called directly, since description cache hits would make the row counts random
+        row_counts = COMPILE_WARMUP_ROWS if self.use_static_cache else (4,)
+        request_count = -(-max(row_counts) // 4)
+        
+        for _ in range(iterations):
+            scenarios = self.generate_weapon_scenarios_batch([request] * request_count)
+            if not (self.model and self.tokenizer):
+                continue
+            
+            weapons = [weapon for weapon_scenarios in scenarios for weapon in weapon_scenarios]
+            for row_count in row_counts:
+                self._generate_ai_descriptions(weapons[:row_count])
+    
+    def generate_weapon_scenarios(self, player1_personality: str, player2_personality: str, 
+                                arena_theme: str = "medieval", num_weapons: int = 4,
+                                use_ai: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Generate weapon scenarios based on player personalities"""
+        return self.generate_weapon_scenarios_batch([{
+            'player1_personality': player1_personality,
+            'player2_personality': player2_personality,
+            'arena_theme': arena_theme,
+            'num_weapons': num_weapons,
+            'use_ai': use_ai
+        }])[0]
+    
+    def _resolve_templates(self, personalities: List[str]) -> List[Dict[str, Any]]:
+        """Look up each weapon's personality template, falling back to aggressive_warrior"""
+        default = self.personality_templates['aggressive_warrior']
+        return [self.personality_templates.get(personality, default) for personality in personalities]
+    
+    def _generate_weapon_stats(self, templates: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        """Roll damage and speed for a batch of weapons, applying personality modifiers"""
+        modifiers = np.stack([template['stat_modifiers'] for template in templates])
+        
+        # One (weapons, stats) draw for both stats, each within its own range
+        lows, highs = zip(*(self.weapon_stats_ranges[stat] for stat in STAT_FIELDS))
+        rolls = RNG.integers(lows, np.add(highs, 1), size=modifiers.shape)
         
         # Ensure stats are within reasonable bounds
-        damage = max(20, min(100, damage))
-        speed = max(10, min(100, speed))
+        stats = np.clip((rolls * modifiers).astype(int), STAT_MIN, STAT_MAX)
+        return stats[:, 0].tolist(), stats[:, 1].tolist()
+    
+    def generate_weapon_scenarios_batch(self, requests: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Generate weapon scenarios for several requests, describing all weapons in one model call"""
+        
+        slots = []
+        use_ai = []
+        for request_index, request in enumerate(requests):
+            player1_personality = request['player1_personality']
+            player2_personality = request['player2_personality']
+            arena_theme = request.get('arena_theme', 'medieval')
+            
+            # Generate 2 weapons for each player
+            for player_num, personality in ((1, player1_personality), (1, player1_personality),
+                                            (2, player2_personality), (2, player2_personality)):
+                slots.append((request_index, player_num, personality, arena_theme))
+                use_ai.append(request.get('use_ai'))
+        
+        # Roll stats and pick components for all weapons in one vectorized pass each
+        templates = self._resolve_templates([personality for _, _, personality, _ in slots])
+        damages, speeds = self._generate_weapon_stats(templates)
+        components = self._pick_weapon_components(templates)
+        
+        weapons = [
+            self._generate_single_weapon(personality, arena_theme, player_num, damage, speed, *weapon_components)
+            for (_, player_num, personality, arena_theme), damage, speed, weapon_components
+            in zip(slots, damages, speeds, components)
+        ]
+        
+        for weapon, description in zip(weapons, self._generate_descriptions(weapons, use_ai)):
+            weapon['description'] = description
+        
+        scenarios = [[] for _ in requests]
+        for (request_index, _, _, _), weapon in zip(slots, weapons):
+            scenarios[request_index].append(weapon)
+        
+        return scenarios
+    
+    def _pick_weapon_components(self, templates: List[Dict[str, Any]]) -> List[Tuple[str, str, str, str]]:
+        """Pick (weapon_type, material, effect, descriptor) for a batch of weapons with one RNG draw"""
+        # One index per component slot of every weapon, each below its own list's length
+        sizes = np.array([[len(template[field]) for field in COMPONENT_FIELDS] for template in templates])
+        picks = RNG.integers(0, sizes).tolist()
+        
+        return [
+            tuple(template[field][index] for field, index in zip(COMPONENT_FIELDS, indices))
+            for template, indices in zip(templates, picks)
+        ]
+    
+    def _generate_single_weapon(self, personality: str, arena_theme: str, player: int, damage: int, speed: int,
+                                weapon_type: str, material: str, effect: str, descriptor: str) -> Dict[str, Any]:
+        """Assemble a single weapon from its picked components; its description is filled in by the batch"""
+        
+        # Generate weapon name
+        weapon_name = self._generate_weapon_name(weapon_type, material, effect, descriptor)
         
         return {
             'weaponName': weapon_name,
-            'description': description,
+            'description': '',
             'fileLocation': '',  # Will be set by main API
             'damage': damage,
             'speed': speed,
@@ -176,106 +510,167 @@ class WeaponTextGenerator:
     def _generate_weapon_name(self, weapon_type: str, material: str, effect: str, descriptor: str) -> str:
         """Generate a weapon name from components"""
         
-        # Different naming patterns
-        patterns = [
-            f"{descriptor.title()} {weapon_type.title()} of {effect.title()}",
-            f"{material.title()} {weapon_type.title()}",
-            f"{effect.title()} {descriptor} {weapon_type}",
-            f"The {descriptor.title()} {weapon_type.title()}",
-            f"{material.title()} {effect.title()} {weapon_type.title()}",
-            f"{effect.title()}-{descriptor} {weapon_type}",
-            f"{descriptor.title()} {material} {weapon_type}"
+        # Build only the naming pattern that was picked
+        return random.choice(WEAPON_NAME_PATTERNS)(weapon_type, material, effect, descriptor)
+    
+    def _generate_descriptions(self, weapons: List[Dict[str, Any]],
+                               use_ai: Optional[List[Optional[bool]]] = None) -> List[str]:
+        """Generate weapon descriptions using AI model or templates"""
+        
+        if not (self.model and self.tokenizer):
+            return [self._describe_with_template(weapon) for weapon in weapons]
+        
+        # Per-weapon override first, otherwise a random share of weapons gets the model
+        if use_ai is None:
+            use_ai = [None] * len(weapons)
+        wants_ai = RNG.random(len(weapons)) < self.ai_description_rate
+        use_ai = [wants if forced is None else forced for forced, wants in zip(use_ai, wants_ai.tolist())]
+        
+        # The prompt depends only on these fields, so repeats reuse an earlier generation
+        keys = [
+            (weapon['descriptor'], weapon['weapon_type'], weapon['material'], weapon['effect'], weapon['arena_theme'])
+            for weapon in weapons
         ]
         
-        return random.choice(patterns)
-    
-    def _generate_description(self, weapon_name: str, weapon_type: str, material: str, 
-                            effect: str, descriptor: str, arena_theme: str) -> str:
-        """Generate weapon description using AI model or templates"""
-        
-        if self.model and self.tokenizer:
-            return self._generate_ai_description(weapon_name, weapon_type, material, effect, descriptor, arena_theme)
-        else:
-            return self._generate_template_description(weapon_name, weapon_type, material, effect, descriptor, arena_theme)
+        with self.description_cache_lock:
+            descriptions = [
+                self.description_cache.get(key) if ai else self._describe_with_template(weapon)
+                for key, ai, weapon in zip(keys, use_ai, weapons)
+            ]
+            for key, ai, description in zip(keys, use_ai, descriptions):
+                if ai and description is not None:
+                    self.description_cache.move_to_end(key)
+        
+        misses = [i for i, description in enumerate(descriptions) if description is None]
+        if misses:
+            generated = self._generate_ai_descriptions([weapons[i] for i in misses])
+            
+            with self.description_cache_lock:
+                for i, description in zip(misses, generated):
+                    if description is None:
+                        descriptions[i] = self._describe_with_template(weapons[i])
+                        continue
+                    
+                    descriptions[i] = description
+                    self.description_cache[keys[i]] = description
+                    if len(self.description_cache) > DESCRIPTION_CACHE_SIZE:
+                        self.description_cache.popitem(last=False)
+        
+        return descriptions
     
-    def _generate_ai_description(self, weapon_name: str, weapon_type: str, material: str, 
-                               effect: str, descriptor: str, arena_theme: str) -> str:
-        """Generate description using AI model"""
+    def _generate_ai_descriptions(self, weapons: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Generate descriptions for a batch of weapons with one model.generate call, None where unusable"""
         try:
-            # Create prompt for weapon description
-            prompt = f"A {descriptor} {weapon_type} made of {material} with {effect} effects in a {arena_theme} arena. This legendary weapon"
+            token_id_lists = []
+            span_ids = self.prompt_span_ids
+            
+            for weapon in weapons:
+                descriptor, weapon_type = weapon['descriptor'], weapon['weapon_type']
+                material, effect, arena_theme = weapon['material'], weapon['effect'], weapon['arena_theme']
+                
+                # Prompt: "A {descriptor} {weapon_type} made of {material} with {effect} effects
+                # in a {arena_theme} arena. This legendary weapon", from pre-tokenized pieces
+                token_id_lists.append(
+                    span_ids[0] + self._encode_field(f" {descriptor} {weapon_type}")
+                    + span_ids[1] + self._encode_field(f" {material}")
+                    + span_ids[2] + self._encode_field(f" {effect}")
+                    + span_ids[3] + self._encode_field(f" {arena_theme}")
+                    + span_ids[4]
+                )
             
-            # Tokenize and generate
-            inputs = self.tokenizer.encode(prompt, return_tensors='pt')
-            if torch.cuda.is_available():
-                inputs = inputs.cuda()
+            if self.use_static_cache:
+                padding = {'padding': 'max_length', 'max_length': STATIC_PROMPT_LEN}
+                
+                # Round the row count up to a power of two so only a few graphs are ever captured
+                padded_rows = 1 << (len(token_id_lists) - 1).bit_length()
+                token_id_lists += [token_id_lists[-1]] * (padded_rows - len(token_id_lists))
+            else:
+                padding = {'padding': 'longest'}
+            
+            inputs = self.tokenizer.pad({'input_ids': token_id_lists}, return_tensors='pt', **padding)
+            if self.use_cuda:
+                # Pinned pages let the copies run as async DMA instead of staged, blocking copies
+                inputs = {
+                    name: tensor.pin_memory().to(self.device, non_blocking=True)
+                    for name, tensor in inputs.items()
+                }
             
-            with torch.no_grad():
+            # Greedy decoding skips the per-step softmax sampling; variety then comes
+            # from the randomly picked components alone
+            if self.sample_descriptions:
+                sampling_kwargs = {'do_sample': True, 'temperature': 0.8}
+            else:
+                sampling_kwargs = {'do_sample': False}
+            
+            # inference_mode also skips the view/version-counter tracking no_grad keeps
+            with torch.inference_mode():
                 outputs = self.model.generate(
-                    inputs,
-                    max_length=inputs.shape[1] + 60,
+                    **inputs,
+                    max_new_tokens=MAX_NEW_TOKENS,
+                    min_new_tokens=MIN_NEW_TOKENS,
+                    eos_token_id=self.stop_token_ids,
                     num_return_sequences=1,
-                    temperature=0.8,
-                    do_sample=True,
                     pad_token_id=self.tokenizer.eos_token_id,
-                    repetition_penalty=1.2
+                    repetition_penalty=1.2,
+                    **sampling_kwargs
                 )
             
-            # Decode and clean up
-            generated_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            description = generated_text[len(prompt):].strip()
-            
-            # Clean up the description
-            if description:
-                # Take first sentence or reasonable length
-                sentences = description.split('.')
-                if sentences[0] and len(sentences[0]) > 10:
-                    description = sentences[0] + '.'
-                else:
-                    description = description[:120] + '...'
-                
-                # Ensure it starts properly
-                if not description[0].isupper():
-                    description = description[0].upper() + description[1:]
-            
-            return description if description and len(description) > 20 else self._generate_template_description(weapon_name, weapon_type, material, effect, descriptor, arena_theme)
+            # Decode only the continuation: prompts are left-padded, so they all end at this column
+            prompt_len = inputs['input_ids'].shape[1]
+            generated_texts = self.tokenizer.batch_decode(
+                outputs[:len(weapons), prompt_len:], skip_special_tokens=True
+            )
             
         except Exception as e:
             logger.warning(f"AI description generation failed: {e}")
-            return self._generate_template_description(weapon_name, weapon_type, material, effect, descriptor, arena_theme)
+            return [None] * len(weapons)
+        
+        return [self._clean_ai_description(generated_text) for generated_text in generated_texts]
+    
+    def _clean_ai_description(self, description: str) -> Optional[str]:
+        """Trim a generated continuation to a usable description, or None if it is unusable"""
+        description = description.strip()
+        
+        # Clean up the description
+        if description:
+            # Take first sentence or reasonable length
+            sentences = description.split('.')
+            if sentences[0] and len(sentences[0]) > 10:
+                description = sentences[0] + '.'
+            else:
+                description = description[:120] + '...'
+            
+            # Ensure it starts properly
+            if not description[0].isupper():
+                description = description[0].upper() + description[1:]
+        
+        return description if description and len(description) > 20 else None
+    
+    def _describe_with_template(self, weapon: Dict[str, Any]) -> str:
+        """Describe a weapon from the fallback templates"""
+        return self._generate_template_description(
+            weapon['weaponName'], weapon['weapon_type'], weapon['material'],
+            weapon['effect'], weapon['descriptor'], weapon['arena_theme']
+        )
     
     def _generate_template_description(self, weapon_name: str, weapon_type: str, material: str, 
                                      effect: str, descriptor: str, arena_theme: str) -> str:
         """Generate description using templates as fallback"""
         
-        # Arena-specific elements
-        arena_elements = {
-            'volcanic': ['molten lava', 'volcanic ash', 'burning rocks', 'fire', 'heat'],
-            'ice': ['frozen crystals', 'icy winds', 'frost', 'glacial power', 'frozen essence'],
-            'forest': ['ancient trees', 'natural magic', 'forest spirits', 'living wood', 'nature\'s power'],
-            'medieval': ['ancient runes', 'battle-tested steel', 'warrior\'s honor', 'knightly valor', 'old magic'],
-            'shadow': ['dark energy', 'shadow essence', 'void power', 'darkness', 'nightmare fuel'],
-            'desert': ['sand storms', 'scorching heat', 'mirage magic', 'desert winds', 'ancient sands']
-        }
+        arena_element = random.choice(ARENA_ELEMENTS.get(arena_theme, ARENA_ELEMENTS['medieval']))
         
-        arena_element = random.choice(arena_elements.get(arena_theme, arena_elements['medieval']))
-        
-        templates = [
-            f"A {descriptor} {weapon_type} forged from {material}, crackling with {effect} energy and infused with {arena_element}.",
-            f"This {material} {weapon_type} radiates {effect} power, its {descriptor} form designed for devastating attacks in {arena_theme} combat.",
-            f"Crafted from finest {material}, this {descriptor} {weapon_type} channels {effect} forces and draws strength from {arena_element}.",
-            f"A legendary {weapon_type} of {material} construction, imbued with {effect} magic and empowered by {arena_element}.",
-            f"The {descriptor} surface of this {material} {weapon_type} glows with {effect} energy, enhanced by the power of {arena_element}.",
-            f"Forged in the heart of {arena_theme} lands, this {descriptor} {weapon_type} combines {material} with {effect} magic.",
-            f"A {descriptor} {weapon_type} that pulses with {effect} energy, its {material} core resonating with {arena_element}.",
-            f"This ancient {weapon_type} of {material} bears the mark of {effect} magic and the essence of {arena_element}."
-        ]
-        
-        return random.choice(templates)
+        return random.choice(DESCRIPTION_TEMPLATES).format_map({
+            'descriptor': descriptor,
+            'weapon_type': weapon_type,
+            'material': material,
+            'effect': effect,
+            'arena_theme': arena_theme,
+            'arena_element': arena_element
+        })
     
     def add_personality_template(self, name: str, template: Dict[str, Any]):
         """Add new personality template"""
-        self.personality_templates[name] = template
+        self.personality_templates[name] = freeze_template(template)
         logger.info(f"Added personality template: {name}")
     
     def get_supported_personalities(self) -> List[str]:
@@ -264,7 +264,12 @@ mkdir -p logs
 echo "🌐 Starting production server with Gunicorn..."
 echo "📍 Web Interface: http://localhost:8083"
 
-gunicorn --bind 0.0.0.0:8083 --workers 4 --worker-class sync --timeout 300 --keep-alive 2 app:app
+# A single worker owns the GPU models; request concurrency comes from threads.
+# Generation requests block their thread while waiting on the GPU, so cap them
+# below the thread count to keep health, listing and download routes responsive.
+GUNICORN_THREADS=${GUNICORN_THREADS:-16}
+export MAX_QUEUE=${MAX_QUEUE:-$((GUNICORN_THREADS - 4))}
+gunicorn --bind 0.0.0.0:8083 --workers 1 --worker-class gthread --threads $GUNICORN_THREADS --timeout 300 --keep-alive 2 app:app
 EOF
 
 chmod +x start_production.sh
@@ -79,7 +79,7 @@ export PYTHONPATH="${PYTHONPATH}:$(pwd)"
 
 # Create necessary directories
 print_status "Creating runtime directories..."
-mkdir -p logs generated_weapons model_cache
+mkdir -p logs generated_weapons model_cache zip_cache
 
 # Check Python dependencies
 print_status "Checking Python dependencies..."
@@ -5,29 +5,218 @@ Demonstrates how to integrate Weapon AI Service with AEON game server
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import time
-from typing import Dict, List, Any
+import copy
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Any
+
+# Optional pooled sync/async HTTP client so concurrent arenas overlap their requests
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Faster JSON encoding of request bodies and decoding of responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# HTTP/2 multiplexing needs the h2 package (httpx[http2]); it applies to TLS connections
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Arenas asking for 3D models within this window share one batch-create call
+MODEL_BATCH_WINDOW = 0.05
+MODEL_BATCH_MAX_ARENAS = 8
+
+# Client-side response caches: scenarios per (player1, player2, arena_theme), and the health status
+SCENARIO_CACHE_SIZE = 1024
+SCENARIO_CACHE_TTL = 600
+HEALTH_CACHE_TTL = 60
+
+# Connection pool sizing and retries; POSTs are only retried when the connection
+# failed, since a generation the server already started must not run twice
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
+RETRIES = 3
+RETRY_BACKOFF = 0.2
+RETRY_STATUSES = (502, 503, 504)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def dump_json(payload: Any) -> bytes:
+    """Serialize a request body to JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+def load_json(data: Any) -> Any:
+    """Parse a JSON response body or stream line"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
 
 class WeaponAIClient:
     """Client for interacting with Weapon AI Service"""
     
     def __init__(self, base_url: str = "http://localhost:8083"):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        self.aclient = None
+        
+        # Arena model requests waiting for the next grouped batch-create call
+        self.pending_models = []
+        self.model_flush_handle = None
+        self.model_batch_tasks = set()
+        
+        # Scenario requests already on the wire, keyed by (player1, player2, arena_theme);
+        # identical concurrent calls wait for these instead of sending their own
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.ainflight = {}
+        
+        # Successful responses: key -> (expires_at, result)
+        self.scenario_cache = OrderedDict()
+        self.health_cache = None
+        self.cache_lock = threading.RLock()
+        
+        # Call sites pass full URLs and per-call timeouts, which both clients accept
+        if HTTPX_AVAILABLE:
+            self.session = httpx.Client(
+                base_url=self.base_url,
+                transport=httpx.HTTPTransport(**self._transport_options()),
+                timeout=self._client_timeout()
+            )
+        else:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES)
+            )
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+    
+    @staticmethod
+    def _transport_options() -> Dict[str, Any]:
+        """Pool and retry settings shared by the sync and async httpx transports"""
+        # httpx transports retry failed connects only; status codes are never retried
+        return {
+            'http2': HTTP2_AVAILABLE,
+            'limits': httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS),
+            'retries': RETRIES
+        }
+    
+    @staticmethod
+    def _json_body(payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Request kwargs carrying a payload serialized once up front"""
+        # httpx takes raw bytes as content=, requests as data=
+        body_arg = 'content' if HTTPX_AVAILABLE else 'data'
+        return {body_arg: dump_json(payload), 'headers': JSON_HEADERS}
+    
+    @staticmethod
+    def _client_timeout():
+        """Default timeout shared by the sync and async httpx clients"""
+        return httpx.Timeout(300.0, connect=5.0)
     
     def health_check(self) -> Dict[str, Any]:
         """Check if the AI service is healthy"""
+        with self.cache_lock:
+            if self.health_cache is not None and self.health_cache[0] > time.monotonic():
+                return copy.deepcopy(self.health_cache[1])
+        
         try:
             response = self.session.get(f"{self.base_url}/api/health", timeout=5)
             response.raise_for_status()
-            return response.json()
+            health = load_json(response.content)
         except Exception as e:
             return {"status": "error", "message": str(e)}
+        
+        # Only a healthy answer is cached, so a starting service is re-checked on every call
+        if health.get("status") == "healthy":
+            with self.cache_lock:
+                self.health_cache = (time.monotonic() + HEALTH_CACHE_TTL, copy.deepcopy(health))
+        return health
+    
+    def invalidate(self):
+        """Drop all cached health and scenario responses"""
+        with self.cache_lock:
+            self.scenario_cache.clear()
+            self.health_cache = None
+    
+    def _get_cached_scenarios(self, key: tuple) -> Any:
+        """Return a private copy of cached scenarios, or None on a miss or expiry"""
+        with self.cache_lock:
+            entry = self.scenario_cache.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self.scenario_cache[key]
+                return None
+            
+            self.scenario_cache.move_to_end(key)
+            return copy.deepcopy(result)
+    
+    def _cache_scenarios(self, key: tuple, result: Dict[str, Any]):
+        """Store a successful scenario response, evicting the oldest entries"""
+        if "error" in result:
+            return
+        
+        with self.cache_lock:
+            self.scenario_cache[key] = (time.monotonic() + SCENARIO_CACHE_TTL, copy.deepcopy(result))
+            self.scenario_cache.move_to_end(key)
+            while len(self.scenario_cache) > SCENARIO_CACHE_SIZE:
+                self.scenario_cache.popitem(last=False)
     
     def generate_weapons(self, player1_personality: str, player2_personality: str, 
                         arena_theme: str = "medieval") -> Dict[str, Any]:
         """Generate weapons based on player personalities"""
+        key = (player1_personality, player2_personality, arena_theme)
+        
+        cached = self._get_cached_scenarios(key)
+        if cached is not None:
+            return cached
+        
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self.inflight[key] = Future()
+        
+        if not is_owner:
+            return copy.deepcopy(future.result())
+        
+        try:
+            result = self._post_generate_weapons(player1_personality, player2_personality, arena_theme)
+            self._cache_scenarios(key, result)
+            # Waiters copy the shared result while this caller may already be changing its own
+            future.set_result(copy.deepcopy(result))
+        except BaseException as e:
+            # Waiting callers must not block forever on a request that never finished
+            future.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                del self.inflight[key]
+        
+        return result
+    
+    def _post_generate_weapons(self, player1_personality: str, player2_personality: str,
+                               arena_theme: str) -> Dict[str, Any]:
+        """Send one scenario generation request"""
         
         payload = {
             "player1_personality": player1_personality,
@@ -38,11 +227,11 @@ class WeaponAIClient:
         try:
             response = self.session.post(
                 f"{self.base_url}/api/weapons/generate",
-                json=payload,
+                **self._json_body(payload),
                 timeout=30
             )
             response.raise_for_status()
-            return response.json()
+            return load_json(response.content)
         except Exception as e:
             return {"error": str(e)}
     
@@ -54,14 +243,248 @@ class WeaponAIClient:
         try:
             response = self.session.post(
                 f"{self.base_url}/api/weapons/batch-create",
-                json=payload,
+                **self._json_body(payload),
+                timeout=300  # 5 minutes for model generation
+            )
+            response.raise_for_status()
+            return load_json(response.content)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def create_3d_models_batch(self, weapons_by_arena: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Generate 3D models for several arenas in one batch-create call, split back per arena"""
+        weapon_lists = list(weapons_by_arena.values())
+        result = self.create_3d_models([weapon for weapons in weapon_lists for weapon in weapons])
+        return dict(zip(weapons_by_arena, self._split_model_results(weapon_lists, result)))
+    
+    @staticmethod
+    def _split_model_results(weapon_lists: List[List[Dict[str, Any]]], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split one batch-create response into per-caller responses, in the order the weapons were sent"""
+        if "error" in result:
+            return [result for _ in weapon_lists]
+        
+        results = result.get("results", [])
+        total_time = result.get("summary", {}).get("total_time", 0)
+        split = []
+        offset = 0
+        
+        for weapons in weapon_lists:
+            own_results = results[offset:offset + len(weapons)]
+            offset += len(weapons)
+            successful = sum(1 for r in own_results if r["status"] == "completed")
+            split.append({
+                "results": own_results,
+                "summary": {
+                    "total": len(weapons),
+                    "successful": successful,
+                    "failed": len(weapons) - successful,
+                    "total_time": total_time
+                }
+            })
+        
+        return split
+    
+    def stream_weapons(self, player1_personality: str, player2_personality: str,
+                       arena_theme: str = "medieval", create_models: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield weapons as the server streams them; with create_models each comes again once its 3D model is done"""
+        
+        payload = {
+            "player1_personality": player1_personality,
+            "player2_personality": player2_personality,
+            "arena_theme": arena_theme,
+            "create_models": create_models
+        }
+        url = f"{self.base_url}/api/weapons/generate/stream"
+        timeout = 300 if create_models else 30
+        
+        try:
+            if HTTPX_AVAILABLE:
+                with self.session.stream("POST", url, **self._json_body(payload), timeout=timeout) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line:
+                            yield load_json(line)
+            else:
+                with self.session.post(url, **self._json_body(payload), timeout=timeout, stream=True) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line:
+                            yield load_json(line)
+        except Exception as e:
+            yield {"error": str(e)}
+    
+    def _async_client(self):
+        """Get the shared async client, creating it on first use"""
+        if self.aclient is None:
+            self.aclient = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=httpx.AsyncHTTPTransport(**self._transport_options()),
+                timeout=self._client_timeout()
+            )
+        return self.aclient
+    
+    async def aclose(self):
+        """Close the async client"""
+        if self.aclient is not None:
+            await self.aclient.aclose()
+            self.aclient = None
+    
+    async def agenerate_weapons(self, player1_personality: str, player2_personality: str,
+                                arena_theme: str = "medieval") -> Dict[str, Any]:
+        """Generate weapons without blocking the event loop"""
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self.generate_weapons, player1_personality, player2_personality, arena_theme)
+        
+        key = (player1_personality, player2_personality, arena_theme)
+        
+        cached = self._get_cached_scenarios(key)
+        if cached is not None:
+            return cached
+        
+        task = self.ainflight.get(key)
+        is_owner = task is None
+        
+        if is_owner:
+            task = asyncio.ensure_future(self._apost_generate_weapons(player1_personality, player2_personality, arena_theme))
+            self.ainflight[key] = task
+            
+            def finish(done_task):
+                self.ainflight.pop(key, None)
+                if not done_task.cancelled() and done_task.exception() is None:
+                    self._cache_scenarios(key, done_task.result())
+            
+            task.add_done_callback(finish)
+        
+        # Shielded so a cancelled caller, the first one included, does not cancel the shared request
+        # Every caller, the first one included, gets a private copy of the shared result
+        return copy.deepcopy(await asyncio.shield(task))
+    
+    async def _apost_generate_weapons(self, player1_personality: str, player2_personality: str,
+                                      arena_theme: str) -> Dict[str, Any]:
+        """Send one scenario generation request on the async client"""
+        
+        payload = {
+            "player1_personality": player1_personality,
+            "player2_personality": player2_personality,
+            "arena_theme": arena_theme
+        }
+        
+        try:
+            response = await self._async_client().post("/api/weapons/generate", **self._json_body(payload), timeout=30)
+            response.raise_for_status()
+            return load_json(response.content)
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def acreate_3d_models(self, weapons: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Generate 3D models for weapons without blocking the event loop"""
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self.create_3d_models, weapons)
+        
+        payload = {"weapons": weapons}
+        
+        try:
+            response = await self._async_client().post(
+                "/api/weapons/batch-create",
+                **self._json_body(payload),
                 timeout=300  # 5 minutes for model generation
             )
             response.raise_for_status()
-            return response.json()
+            return load_json(response.content)
         except Exception as e:
             return {"error": str(e)}
     
+    async def acreate_3d_models_grouped(self, weapons: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Generate 3D models, sharing one batch-create call with other arenas asking at the same time"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending_models.append((weapons, future))
+        
+        if len(self.pending_models) >= MODEL_BATCH_MAX_ARENAS:
+            self._flush_pending_models()
+        elif self.model_flush_handle is None:
+            self.model_flush_handle = loop.call_later(MODEL_BATCH_WINDOW, self._flush_pending_models)
+        
+        return await future
+    
+    def _flush_pending_models(self):
+        """Send every waiting arena's weapons as one batch-create call"""
+        if self.model_flush_handle is not None:
+            self.model_flush_handle.cancel()
+            self.model_flush_handle = None
+        
+        pending, self.pending_models = self.pending_models, []
+        task = asyncio.ensure_future(self._send_model_batch(pending))
+        self.model_batch_tasks.add(task)
+        task.add_done_callback(self.model_batch_tasks.discard)
+    
+    async def _send_model_batch(self, pending: List[tuple]):
+        """Run one grouped batch-create call and hand each arena its share of the results"""
+        weapon_lists = [weapons for weapons, _ in pending]
+        result = await self.acreate_3d_models([weapon for weapons in weapon_lists for weapon in weapons])
+        
+        for (_, future), own_result in zip(pending, self._split_model_results(weapon_lists, result)):
+            if not future.done():
+                future.set_result(own_result)
+    
+    async def astream_weapons(self, player1_personality: str, player2_personality: str,
+                              arena_theme: str = "medieval", create_models: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Yield streamed weapons without blocking the event loop"""
+        if not HTTPX_AVAILABLE:
+            weapons = await asyncio.to_thread(
+                list, self.stream_weapons(player1_personality, player2_personality, arena_theme, create_models)
+            )
+            for weapon in weapons:
+                yield weapon
+            return
+        
+        payload = {
+            "player1_personality": player1_personality,
+            "player2_personality": player2_personality,
+            "arena_theme": arena_theme,
+            "create_models": create_models
+        }
+        
+        try:
+            async with self._async_client().stream(
+                "POST", "/api/weapons/generate/stream", **self._json_body(payload), timeout=300 if create_models else 30
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield load_json(line)
+        except Exception as e:
+            yield {"error": str(e)}
+    
+    async def afull_weapon_generation_pipeline(self, player1_personality: str,
+                                               player2_personality: str,
+                                               arena_theme: str = "medieval") -> Dict[str, Any]:
+        """Complete pipeline: generate scenarios + 3D models, awaitable alongside other arenas"""
+        
+        weapons_result = await self.agenerate_weapons(player1_personality, player2_personality, arena_theme)
+        
+        if "error" in weapons_result:
+            return {"error": f"Scenario generation failed: {weapons_result['error']}"}
+        
+        # The grouping window merges this arena's weapons with other arenas' into shared batch-create calls
+        weapons = weapons_result.get("weapons", [])
+        models_result = await self.acreate_3d_models_grouped(weapons)
+        
+        if "error" in models_result:
+            return {"error": f"3D model generation failed: {models_result['error']}"}
+        
+        return {
+            "weapons": weapons,
+            "model_results": models_result,
+            "summary": {
+                "total_weapons": len(weapons),
+                "successful_models": models_result.get("summary", {}).get("successful", 0),
+                "player1_personality": player1_personality,
+                "player2_personality": player2_personality,
+                "arena_theme": arena_theme
+            }
+        }
+    
     def full_weapon_generation_pipeline(self, player1_personality: str, 
                                       player2_personality: str, 
                                       arena_theme: str = "medieval") -> Dict[str, Any]:
@@ -127,22 +550,24 @@ class AEONGameServerIntegration:
             arena_data = await self.fetch_arena_data(arena_id)
             arena_theme = arena_data.get("theme", "medieval")
             
-            # Step 3: Generate weapons using AI service
-            result = self.weapon_ai.full_weapon_generation_pipeline(
-                player1_personality, player2_personality, arena_theme
-            )
-            
-            if "error" in result:
-                print(f"❌ Weapon generation failed: {result['error']}")
-                return False
+            # Step 3: Generate weapons using AI service, telling Unity about each one as it
+            # arrives and again once its 3D model is ready
+            weapons = []
+            async for weapon in self.weapon_ai.astream_weapons(
+                player1_personality, player2_personality, arena_theme, create_models=True
+            ):
+                if "error" in weapon:
+                    print(f"❌ Weapon generation failed: {weapon['error']}")
+                    return False
+                
+                if "modelStatus" in weapon:
+                    weapons.append(weapon)
+                
+                await self.notify_unity_clients(arena_id, [weapon])
             
             # Step 4: Store weapons in game database
-            weapons = result["weapons"]
             await self.store_arena_weapons(arena_id, weapons)
             
-            # Step 5: Notify Unity clients about new weapons
-            await self.notify_unity_clients(arena_id, weapons)
-            
             print(f"🎮 Arena {arena_id} equipped with {len(weapons)} AI-generated weapons!")
             return True
             
@@ -150,6 +575,13 @@ class AEONGameServerIntegration:
             print(f"❌ Arena setup failed: {e}")
             return False
     
+    async def on_arenas_open(self, arenas: List[Dict[str, str]]) -> List[bool]:
+        """Equip several arenas at once; their requests overlap and batch on the server"""
+        return await asyncio.gather(*[
+            self.on_players_enter_arena(arena["player1_id"], arena["player2_id"], arena["arena_id"])
+            for arena in arenas
+        ])
+    
     async def fetch_player_data(self, player_id: str) -> Dict[str, Any]:
         """Fetch player data from game database"""
         # This would interact with your PostgreSQL database
@@ -188,6 +620,24 @@ class AEONGameServerIntegration:
         }
         print(f"📡 Notifying Unity clients: {len(weapons)} weapons available")
 
+# Personality pairs exercised together by the concurrent matchup test
+TEST_MATCHUPS = [
+    ("aggressive_warrior", "strategic_mage", "volcanic"),
+    ("defensive_guardian", "agile_assassin", "ice"),
+    ("elemental_mage", "dark_necromancer", "forest"),
+    ("holy_paladin", "chaos_berserker", "desert")
+]
+
+async def generate_matchups(client: WeaponAIClient, matchups: List[tuple]) -> List[Dict[str, Any]]:
+    """Generate weapons for several matchups at once on one event loop"""
+    try:
+        return await asyncio.gather(*[
+            client.agenerate_weapons(player1, player2, arena_theme)
+            for player1, player2, arena_theme in matchups
+        ])
+    finally:
+        await client.aclose()
+
 def test_weapon_ai_service():
     """Test the Weapon AI Service"""
     
@@ -209,7 +659,7 @@ def test_weapon_ai_service():
     
     # Test 2: Generate weapon scenarios
     print("\n2. Weapon Scenario Generation")
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     result = client.generate_weapons(
         player1_personality="aggressive_warrior",
@@ -217,7 +667,7 @@ def test_weapon_ai_service():
         arena_theme="volcanic"
     )
     
-    scenario_time = time.time() - start_time
+    scenario_time = time.perf_counter() - start_time
     
     if "error" in result:
         print(f"❌ Failed: {result['error']}")
@@ -231,13 +681,27 @@ def test_weapon_ai_service():
         print(f"      Damage: {weapon['damage']}, Speed: {weapon['speed']}")
         print(f"      Description: {weapon['description'][:60]}...")
     
-    # Test 3: Generate 3D models (this will take longer)
-    print(f"\n3. 3D Model Generation")
+    # Test 3: Several matchups in flight together, so the wall time is about the slowest one
+    print("\n3. Concurrent Personality Matchups")
+    start_time = time.perf_counter()
+    
+    matchup_results = asyncio.run(generate_matchups(client, TEST_MATCHUPS))
+    
+    matchup_time = time.perf_counter() - start_time
+    
+    for (player1, player2, arena_theme), matchup_result in zip(TEST_MATCHUPS, matchup_results):
+        status_emoji = "❌" if "error" in matchup_result else "✅"
+        print(f"   {status_emoji} {player1} vs {player2} ({arena_theme}): "
+              f"{len(matchup_result.get('weapons', []))} weapons")
+    print(f"   {len(TEST_MATCHUPS)} matchups in {matchup_time:.2f}s")
+    
+    # Test 4: Generate 3D models (this will take longer)
+    print(f"\n4. 3D Model Generation")
     print("   ⏳ This may take several minutes...")
     
-    start_time = time.time()
+    start_time = time.perf_counter()
     model_result = client.create_3d_models(weapons)
-    model_time = time.time() - start_time
+    model_time = time.perf_counter() - start_time
     
     if "error" in model_result:
         print(f"❌ Failed: {model_result['error']}")
@@ -267,14 +731,15 @@ def demo_integration():
     integration = AEONGameServerIntegration()
     
     # Simulate players entering arena
-    import asyncio
-    
     async def simulate_arena_entry():
-        success = await integration.on_players_enter_arena(
-            player1_id="player_001",
-            player2_id="player_002", 
-            arena_id="arena_volcanic_01"
-        )
+        try:
+            success = await integration.on_players_enter_arena(
+                player1_id="player_001",
+                player2_id="player_002", 
+                arena_id="arena_volcanic_01"
+            )
+        finally:
+            await integration.weapon_ai.aclose()
         
         if success:
             print("🏆 Arena successfully equipped with AI-generated weapons!")
@@ -288,11 +753,10 @@ if __name__ == "__main__":
     print("🔥 AEON Weapon AI Service - Test Client")
     print("=" * 60)
     
-    # Test the AI service
-    test_weapon_ai_service()
-    
-    # Demo integration
-    demo_integration()
+    # The service test and the integration demo share no state, so run them side by side
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for future in [executor.submit(test_weapon_ai_service), executor.submit(demo_integration)]:
+            future.result()
     
     print("\n✨ Testing completed!")
     print("\n📖 Integration Notes:")
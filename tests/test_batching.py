@@ -0,0 +1,89 @@
+"""Tests for the request batching helpers behind the scenario and 3D model dispatchers"""
+
+import queue
+import threading
+import time
+
+import pytest
+
+import app
+
+@pytest.fixture
+def batch_config(monkeypatch):
+    monkeypatch.setitem(app.CONFIG, 'MAX_BATCH', 3)
+    monkeypatch.setitem(app.CONFIG, 'MAX_BATCH_DELAY_MS', 50)
+
+def test_collect_batch_stops_at_max_batch(batch_config):
+    request_queue = queue.Queue()
+    for i in range(5):
+        request_queue.put(i)
+    
+    assert app.collect_batch(request_queue) == [0, 1, 2]
+    assert app.collect_batch(request_queue) == [3, 4]
+
+def test_collect_batch_closes_window_after_delay(batch_config):
+    request_queue = queue.Queue()
+    request_queue.put('first')
+    
+    start = time.monotonic()
+    batch = app.collect_batch(request_queue)
+    elapsed = time.monotonic() - start
+    
+    assert batch == ['first']
+    assert 0.04 <= elapsed < 1.0
+
+def test_collect_batch_includes_requests_arriving_within_window(batch_config):
+    request_queue = queue.Queue()
+    request_queue.put('first')
+    threading.Timer(0.01, request_queue.put, args=('second',)).start()
+    
+    assert app.collect_batch(request_queue) == ['first', 'second']
+
+def test_wait_batched_result_returns_result():
+    event = threading.Event()
+    result_box = {'result': 42}
+    event.set()
+    
+    assert app.wait_batched_result(event, result_box, time.monotonic() + 1) == 42
+
+def test_wait_batched_result_raises_dispatcher_error():
+    event = threading.Event()
+    result_box = {'error': ValueError('generation failed')}
+    event.set()
+    
+    with pytest.raises(ValueError, match='generation failed'):
+        app.wait_batched_result(event, result_box, time.monotonic() + 1)
+
+def test_wait_batched_result_times_out():
+    start = time.monotonic()
+    
+    with pytest.raises(TimeoutError):
+        app.wait_batched_result(threading.Event(), {}, start + 0.05)
+    
+    assert time.monotonic() - start < 1.0
+
+def test_wait_batched_result_past_deadline_does_not_block():
+    with pytest.raises(TimeoutError):
+        app.wait_batched_result(threading.Event(), {}, time.monotonic() - 10)
+
+def test_submit_batched_requests_shares_one_deadline():
+    # Nothing serves this queue, so every request must time out within the single budget
+    start = time.monotonic()
+    
+    with pytest.raises(TimeoutError):
+        app.submit_batched_requests(queue.Queue(), [{}, {}, {}], timeout=0.1)
+    
+    assert time.monotonic() - start < 0.5
+
+def test_submit_batched_requests_returns_results_in_order():
+    request_queue = queue.Queue()
+    
+    def serve():
+        for _ in range(3):
+            payload, event, result_box = request_queue.get()
+            result_box['result'] = payload['n'] * 10
+            event.set()
+    
+    threading.Thread(target=serve, daemon=True).start()
+    
+    assert app.submit_batched_requests(request_queue, [{'n': 1}, {'n': 2}, {'n': 3}], timeout=5) == [10, 20, 30]
@@ -0,0 +1,86 @@
+"""Tests for merging concurrent GPU worker calls"""
+
+import threading
+
+import pytest
+
+from gpu_worker import GPUWorker
+
+class FakeModelGenerator:
+    """Records each merged call and echoes back one result per description"""
+    
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+    
+    def generate_model_batch(self, descriptions, output_paths):
+        self.calls.append(list(descriptions))
+        if self.fail:
+            raise RuntimeError('pipeline failed')
+        return [f'{description}->{path}' for description, path in zip(descriptions, output_paths)]
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setenv('MAX_BATCH_DELAY_MS', '200')
+    monkeypatch.setenv('EMPTY_CACHE_AFTER_BATCH', 'False')
+    return GPUWorker('unused.sock', b'test')
+
+def start_merge_loop(worker):
+    threading.Thread(
+        target=worker.merge_loop, args=('model', 'generate_model_batch'), daemon=True
+    ).start()
+
+def submit_concurrently(worker, calls):
+    """Submit each call's (descriptions, output_paths) from its own thread; return results or errors"""
+    outcomes = [None] * len(calls)
+    
+    def submit(i, descriptions, output_paths):
+        try:
+            outcomes[i] = worker.submit_merged('model', 'generate_model_batch', (descriptions, output_paths), {})
+        except Exception as e:
+            outcomes[i] = e
+    
+    threads = [threading.Thread(target=submit, args=(i, *call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+def test_merge_loop_slices_results_per_caller(worker):
+    generator = FakeModelGenerator()
+    worker.generators['model'] = generator
+    start_merge_loop(worker)
+    
+    calls = [(['a1', 'a2'], ['pa1', 'pa2']), (['b1'], ['pb1']), (['c1', 'c2', 'c3'], ['pc1', 'pc2', 'pc3'])]
+    outcomes = submit_concurrently(worker, calls)
+    
+    for (descriptions, paths), outcome in zip(calls, outcomes):
+        assert outcome == [f'{description}->{path}' for description, path in zip(descriptions, paths)]
+    
+    # All three callers arrived inside one batch window
+    assert len(generator.calls) == 1
+    assert sorted(generator.calls[0]) == ['a1', 'a2', 'b1', 'c1', 'c2', 'c3']
+
+def test_merge_loop_accepts_keyword_arguments(worker):
+    worker.generators['model'] = FakeModelGenerator()
+    start_merge_loop(worker)
+    
+    result = worker.submit_merged('model', 'generate_model_batch', (), {'descriptions': ['x'], 'output_paths': ['px']})
+    
+    assert result == ['x->px']
+
+def test_merge_loop_sends_error_to_every_caller(worker):
+    worker.generators['model'] = FakeModelGenerator(fail=True)
+    start_merge_loop(worker)
+    
+    outcomes = submit_concurrently(worker, [(['a'], ['pa']), (['b'], ['pb'])])
+    
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+def test_submit_merged_times_out_without_merge_loop(worker):
+    worker.generators['model'] = FakeModelGenerator()
+    worker.merge_timeouts['model'] = 0.05
+    
+    with pytest.raises(TimeoutError):
+        worker.submit_merged('model', 'generate_model_batch', (['a'], ['pa']), {})
@@ -0,0 +1,54 @@
+"""Tests for when the API rescans the weapon output directory"""
+
+import os
+
+import pytest
+
+import app
+
+def write_weapon(directory, name):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'v')
+    return path
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    weapons_dir = tmp_path / 'weapons'
+    weapons_dir.mkdir()
+    monkeypatch.setitem(app.CONFIG, 'WEAPON_OUTPUT_DIR', str(weapons_dir))
+    monkeypatch.setitem(app.CONFIG, 'WEAPON_INDEX_PATH', str(tmp_path / 'index.sqlite'))
+    monkeypatch.setitem(app.CONFIG, 'INDEX_RESYNC_INTERVAL', 3600)
+    monkeypatch.setattr(app, 'weapon_index', None)
+    monkeypatch.setattr(app, '_index_state', {'dir_mtime': None, 'synced_at': 0.0})
+    yield str(weapons_dir)
+    app.weapon_index.close()
+
+def test_first_use_syncs_and_keeps_database_out_of_output_dir(output_dir):
+    write_weapon(output_dir, 'a.obj')
+    
+    assert app.get_weapon_index().count() == 1
+    assert os.listdir(output_dir) == ['a.obj']
+
+def test_api_writes_do_not_trigger_a_rescan(output_dir, monkeypatch):
+    index = app.get_weapon_index()
+    calls = []
+    monkeypatch.setattr(index, 'sync', lambda: calls.append(1))
+    
+    app.index_weapon_file(write_weapon(output_dir, 'a.obj'), description='a sword')
+    path = write_weapon(output_dir, 'b.obj')
+    app.index_weapon_file(path)
+    os.remove(path)
+    app.unindex_weapon_file(path)
+    
+    assert app.get_weapon_index().count() == 1
+    assert calls == []
+
+def test_outside_changes_are_picked_up_after_the_interval(output_dir):
+    app.get_weapon_index()
+    write_weapon(output_dir, 'outside.obj')
+    
+    assert app.get_weapon_index().count() == 0
+    
+    app._index_state['synced_at'] -= app.CONFIG['INDEX_RESYNC_INTERVAL']
+    assert app.get_weapon_index().count() == 1
@@ -0,0 +1,84 @@
+"""Tests for the SQLite weapon index"""
+
+import os
+
+import pytest
+
+from weapon_index import WeaponIndex
+
+def write_weapon(directory, name, size=10):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'v' * size)
+    return path
+
+@pytest.fixture
+def index(tmp_path):
+    weapon_index = WeaponIndex(str(tmp_path), str(tmp_path.parent / f'{tmp_path.name}.sqlite'))
+    yield weapon_index
+    weapon_index.close()
+
+def test_sync_indexes_obj_files_only(index, tmp_path):
+    write_weapon(tmp_path, 'a.obj', size=5)
+    write_weapon(tmp_path, 'b.obj', size=7)
+    write_weapon(tmp_path, 'notes.txt')
+    
+    assert index.sync() == 2
+    assert index.count() == 2
+    assert index.get_stats()['total_size'] == 12
+    assert {weapon['filename'] for weapon in index.list_weapons()} == {'a.obj', 'b.obj'}
+
+def test_sync_drops_files_removed_from_disk(index, tmp_path):
+    write_weapon(tmp_path, 'a.obj')
+    stale = write_weapon(tmp_path, 'b.obj')
+    index.sync()
+    
+    os.remove(stale)
+    
+    assert index.sync() == 1
+    assert [weapon['filename'] for weapon in index.list_weapons()] == ['a.obj']
+
+def test_sync_keeps_recorded_metadata(index, tmp_path):
+    path = write_weapon(tmp_path, 'a.obj')
+    index.record(path, description='a sword', personality='aggressive_warrior', arena_theme='volcanic')
+    
+    index.sync()
+    
+    weapon, = index.list_weapons()
+    assert weapon['personality'] == 'aggressive_warrior'
+    assert weapon['arena_theme'] == 'volcanic'
+
+def test_record_refreshes_file_stats(index, tmp_path):
+    path = write_weapon(tmp_path, 'a.obj', size=3)
+    index.record(path)
+    write_weapon(tmp_path, 'a.obj', size=9)
+    index.record(path)
+    
+    assert index.count() == 1
+    assert index.list_weapons()[0]['size'] == 9
+
+def test_remove_deletes_entry(index, tmp_path):
+    index.record(write_weapon(tmp_path, 'a.obj'))
+    index.record(write_weapon(tmp_path, 'b.obj'))
+    
+    index.remove('a.obj')
+    
+    assert [weapon['filename'] for weapon in index.list_weapons()] == ['b.obj']
+    index.remove('missing.obj')
+    assert index.count() == 1
+
+def test_listing_pages_cover_every_weapon_once(index, tmp_path):
+    for name in ['a.obj', 'b.obj', 'c.obj']:
+        write_weapon(tmp_path, name)
+    index.sync()
+    
+    first_page = [weapon['filename'] for weapon in index.list_weapons(limit=2)]
+    second_page = [weapon['filename'] for weapon in index.list_weapons(limit=2, offset=2)]
+    filenames, _, _, _ = index.list_columns()
+    
+    assert len(first_page) == 2 and len(second_page) == 1
+    assert first_page + second_page == filenames
+    assert sorted(filenames) == ['a.obj', 'b.obj', 'c.obj']
+
+def test_list_columns_empty_index(index):
+    assert index.list_columns() == ([], [], [], [])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Weapon Index
+Persistent SQLite index of generated weapon models
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weapons (
+    filename TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    modified_at REAL NOT NULL,
+    personality TEXT,
+    arena_theme TEXT,
+    desc_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_weapons_created_at ON weapons (created_at);
+"""
+
+# File metadata is refreshed on conflict; generation metadata is kept unless a new value is given
+UPSERT_SQL = """
+INSERT INTO weapons (filename, file_path, size, created_at, modified_at, personality, arena_theme, desc_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (filename) DO UPDATE SET
+    file_path = excluded.file_path,
+    size = excluded.size,
+    created_at = excluded.created_at,
+    modified_at = excluded.modified_at,
+    personality = COALESCE(excluded.personality, weapons.personality),
+    arena_theme = COALESCE(excluded.arena_theme, weapons.arena_theme),
+    desc_hash = COALESCE(excluded.desc_hash, weapons.desc_hash)
+"""
+
+class WeaponIndex:
+    """SQLite-backed index of the .obj files in the weapon output directory"""
+    
+    def __init__(self, output_dir: str, db_path: str):
+        self.output_dir = output_dir
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        
+        # Shared across request threads; every access goes through self.lock
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+    
+    def sync(self) -> int:
+        """Reconcile the index with the files currently on disk"""
+        rows = []
+        
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.obj'):
+                    continue
+                
+                file_stats = entry.stat()
+                rows.append((
+                    entry.name, entry.path, file_stats.st_size,
+                    file_stats.st_ctime, file_stats.st_mtime, None, None, None
+                ))
+        
+        with self.lock, self.db:
+            self.db.execute('CREATE TEMP TABLE IF NOT EXISTS on_disk (filename TEXT PRIMARY KEY)')
+            self.db.execute('DELETE FROM on_disk')
+            self.db.executemany('INSERT INTO on_disk VALUES (?)', ((row[0],) for row in rows))
+            self.db.execute('DELETE FROM weapons WHERE filename NOT IN (SELECT filename FROM on_disk)')
+            self.db.executemany(UPSERT_SQL, rows)
+        
+        logger.info(f"Weapon index synced: {len(rows)} files")
+        return len(rows)
+    
+    def record(self, file_path: str, description: Optional[str] = None,
+               personality: Optional[str] = None, arena_theme: Optional[str] = None):
+        """Add or refresh the entry for a freshly written weapon file"""
+        file_stats = os.stat(file_path)
+        desc_hash = hashlib.md5(description.encode()).hexdigest() if description else None
+        
+        with self.lock, self.db:
+            self.db.execute(UPSERT_SQL, (
+                os.path.basename(file_path), file_path, file_stats.st_size,
+                file_stats.st_ctime, file_stats.st_mtime, personality, arena_theme, desc_hash
+            ))
+    
+    def remove(self, filename: str):
+        """Drop the entry for a deleted weapon file"""
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM weapons WHERE filename = ?', (filename,))
+    
+    def list_weapons(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get indexed weapons, newest first"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT filename, file_path, size, created_at, modified_at, personality, arena_theme '
+                'FROM weapons ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        
+        return [
+            {
+                'filename': filename,
+                'file_path': file_path,
+                'web_path': f"/download/weapon/{filename}",
+                'size': size,
+                'created_at': datetime.fromtimestamp(created_at).isoformat(),
+                'modified_at': datetime.fromtimestamp(modified_at).isoformat(),
+                'personality': personality,
+                'arena_theme': arena_theme
+            }
+            for filename, file_path, size, created_at, modified_at, personality, arena_theme in rows
+        ]
+    
+    def list_columns(self, limit: Optional[int] = None, offset: int = 0) -> Tuple[List, List, List, List]:
+        """Get indexed weapons, newest first, as (filenames, sizes, created_at, modified_at) columns"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT filename, size, created_at, modified_at '
+                'FROM weapons ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        
+        if not rows:
+            return [], [], [], []
+        return tuple(list(column) for column in zip(*rows))
+    
+    def count(self) -> int:
+        """Get the number of indexed weapons"""
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM weapons').fetchone()[0]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get aggregate file stats in a single query"""
+        with self.lock:
+            total_files, total_size = self.db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM weapons'
+            ).fetchone()
+            oldest = self.db.execute(
+                'SELECT file_path FROM weapons ORDER BY created_at ASC LIMIT 1'
+            ).fetchone()
+            newest = self.db.execute(
+                'SELECT file_path FROM weapons ORDER BY created_at DESC LIMIT 1'
+            ).fetchone()
+        
+        return {
+            'total_files': total_files,
+            'total_size': total_size,
+            'oldest_file': oldest[0] if oldest else None,
+            'newest_file': newest[0] if newest else None
+        }
+    
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.db.close()